@@ -148,6 +148,38 @@ def safe_fetch(func, name, **kwargs):
         print(f"\r❌ [{name}] 失败: {str(e)[:50]}")
         return None
 
+# clean_numeric 与 NUMERIC_PLACEHOLDERS 在 economic/fetch_data.py、lof_arbitrage/fetch_data.py、
+# dividend/fetch_stocks.py 中各有一份且必须保持一致：三个目录是各自独立运行的脚本（run.sh 按路径启动，
+# 没有共享包），修改时三处同步
+NUMERIC_PLACEHOLDERS = {'', '-', '--', '---', 'None', 'nan', '<NA>'}  # 各数据源表示缺失的占位文本
+
+def clean_numeric(values):
+    """
+    向量化数值清洗：整列转 float（去掉 % , 亿），无法解析的置为 NaN，逐项结果与 clean_value 一致
+    """
+    if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+        return values.astype(float)
+    if values.empty:
+        return pd.Series(index=values.index, name=values.name, dtype=float)
+    # 不用 values.str.replace + pd.to_numeric：未装 pyarrow 时 .str 方法是逐元素的 Python 循环，
+    # 三次 replace 加一次 notna 掩码并不比 apply(clean_value) 快。改为用行情数据里不会出现的 '\x00'
+    # 把整列拼成一个字符串，3 次 str.replace 在 C 层一次扫完，再 split 回原长度交给 np.array 解析；
+    # 缺失值 str() 后为 'nan' / 'None'，解析结果本身就是 NaN，无需再按 notna 掩码
+    text = '\x00'.join(map(str, values.tolist()))
+    for noise in ('%', ',', '亿'):
+        text = text.replace(noise, '')
+    parts = text.split('\x00')
+    try:
+        result = np.array(parts, dtype=float)
+    except ValueError:
+        # 含 '' / '--' 等占位符或无法解析的文本时才逐项处理，最后由 pd.to_numeric 把剩余文本置为 NaN
+        parts = ['nan' if part.strip() in NUMERIC_PLACEHOLDERS else part for part in parts]
+        try:
+            result = np.array(parts, dtype=float)
+        except ValueError:
+            result = pd.to_numeric(pd.Series(parts, dtype=object), errors='coerce').to_numpy(dtype=float)
+    return pd.Series(result, index=values.index, name=values.name)
+
 # ==========================================
 # 📥 数据获取 - 指数相关
 # ==========================================
@@ -345,7 +377,7 @@ def calculate_ttm_dividend_yield(price, dividend_df):
             one_year_before_latest = latest_date - timedelta(days=365)
             recent_dividends = implemented[implemented['派息日期'] >= one_year_before_latest]
         
-        total_dividend_per_10 = recent_dividends['派息'].astype(float).sum()
+        total_dividend_per_10 = clean_numeric(recent_dividends['派息']).sum()
         dividend_per_share = total_dividend_per_10 / 10
         ttm_yield = (dividend_per_share / price) * 100
         return round(ttm_yield, 2)
@@ -363,7 +395,7 @@ def calculate_dividend_yield_history(dividend_df, price_df):
             return []
         implemented['派息日期'] = pd.to_datetime(implemented['除权除息日'], errors='coerce')
         implemented = implemented.dropna(subset=['派息日期'])
-        implemented['每股派息'] = implemented['派息'].astype(float) / 10
+        implemented['每股派息'] = clean_numeric(implemented['派息']) / 10
         implemented = implemented.sort_values('派息日期')
         if implemented.empty:
             return []
@@ -1,9 +1,14 @@
 import akshare as ak
+import numpy as np
 import pandas as pd
 import json
 import re
+import hashlib
 import os
 import sys
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 import requests
 import urllib3
@@ -35,6 +40,9 @@ def new_request(self, method, url, *args, **kwargs):
     return old_request(self, method, url, *args, **kwargs)
 requests.Session.request = new_request
 
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.path.join(SCRIPT_DIR, ".cache")
+
 # ==========================================
 # ⚙️ 1. 核心指标配置 & 标签字典
 # ==========================================
@@ -80,6 +88,9 @@ INDICATOR_MAP = {
 # 核心校验名单
 CRITICAL_KEYS = [k for k in INDICATOR_MAP.keys()]
 
+# 输出格式：compact 为列式压缩（默认），legacy 为 {date, value} 对象数组；可用 --format=legacy 切换
+OUTPUT_FORMAT = os.environ.get('MACRO_OUTPUT_FORMAT', 'compact')
+
 # ==========================================
 # 2. 核心工具函数
 # ==========================================
@@ -89,6 +100,38 @@ def clean_value(val):
     try: return float(str_val)
     except: return None
 
+# clean_numeric 与 NUMERIC_PLACEHOLDERS 在 economic/fetch_data.py、lof_arbitrage/fetch_data.py、
+# dividend/fetch_stocks.py 中各有一份且必须保持一致：三个目录是各自独立运行的脚本（run.sh 按路径启动，
+# 没有共享包），修改时三处同步
+NUMERIC_PLACEHOLDERS = {'', '-', '--', '---', 'None', 'nan', '<NA>'}  # 各数据源表示缺失的占位文本
+
+def clean_numeric(values):
+    """
+    向量化数值清洗：整列转 float（去掉 % , 亿），无法解析的置为 NaN，逐项结果与 clean_value 一致
+    """
+    if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+        return values.astype(float)
+    if values.empty:
+        return pd.Series(index=values.index, name=values.name, dtype=float)
+    # 不用 values.str.replace + pd.to_numeric：未装 pyarrow 时 .str 方法是逐元素的 Python 循环，
+    # 三次 replace 加一次 notna 掩码并不比 apply(clean_value) 快。改为用行情数据里不会出现的 '\x00'
+    # 把整列拼成一个字符串，3 次 str.replace 在 C 层一次扫完，再 split 回原长度交给 np.array 解析；
+    # 缺失值 str() 后为 'nan' / 'None'，解析结果本身就是 NaN，无需再按 notna 掩码
+    text = '\x00'.join(map(str, values.tolist()))
+    for noise in ('%', ',', '亿'):
+        text = text.replace(noise, '')
+    parts = text.split('\x00')
+    try:
+        result = np.array(parts, dtype=float)
+    except ValueError:
+        # 含 '' / '--' 等占位符或无法解析的文本时才逐项处理，最后由 pd.to_numeric 把剩余文本置为 NaN
+        parts = ['nan' if part.strip() in NUMERIC_PLACEHOLDERS else part for part in parts]
+        try:
+            result = np.array(parts, dtype=float)
+        except ValueError:
+            result = pd.to_numeric(pd.Series(parts, dtype=object), errors='coerce').to_numpy(dtype=float)
+    return pd.Series(result, index=values.index, name=values.name)
+
 def find_column(columns, keywords):
     for col in columns:
         col_lower = str(col).lower().strip()
@@ -121,323 +164,429 @@ def smart_date_parser(date_val):
     try: return pd.to_datetime(clean_str).strftime('%Y-%m-%d')
     except: return None
 
+# ------------------------------------------
+# 向量化日期解析：按格式对整列分类，每类一次 pd.to_datetime
+# 结果与逐行 smart_date_parser 完全一致（无法识别的行回退逐行解析）
+# ------------------------------------------
+# 判断顺序与 smart_date_parser 保持一致
+_QUARTER_MONTH_DAY = [
+    ('一', '03-31'), ('1', '03-31'), ('Q1', '03-31'),
+    ('二', '06-30'), ('2', '06-30'), ('Q2', '06-30'),
+    ('三', '09-30'), ('3', '09-30'), ('Q3', '09-30'),
+    ('四', '12-31'), ('4', '12-31'), ('Q4', '12-31'),
+]
+
+def _match_quarter(s):
+    return s.str.contains('季度', regex=False) | s.str.contains('Q', regex=False)
+
+def _parse_ym_dash(s):
+    return pd.to_datetime(s, format='%Y-%m', errors='coerce').dt.strftime('%Y-%m-%d')
+
+def _parse_ymd(s):
+    return s
+
+def _parse_ym_compact(s):
+    return pd.to_datetime(s, format='%Y%m', errors='coerce').dt.strftime('%Y-%m-%d')
+
+def _parse_ym_dot(s):
+    return pd.to_datetime(s, format='%Y.%m', errors='coerce').dt.strftime('%Y-%m-%d')
+
+def _parse_quarter(s):
+    year = s.str.extract(r'(\d{4})', expand=False)
+    month_day = np.select(
+        [s.str.contains(k, regex=False) for k, _ in _QUARTER_MONTH_DAY],
+        [v for _, v in _QUARTER_MONTH_DAY],
+        default='',
+    )
+    result = year + '-' + pd.Series(month_day, index=s.index)
+    return result.where(year.notna() & (month_day != ''))
+
+def _parse_cn_ym(s):
+    parts = s.str.extract(r'^(\d{4})年(\d{1,2})月')
+    return pd.to_datetime(parts[0] + '-' + parts[1], format='%Y-%m', errors='coerce').dt.strftime('%Y-%m-%d')
+
+def _parse_ymd_hms(s):
+    return pd.to_datetime(s, format='%Y-%m-%d %H:%M:%S', errors='coerce').dt.strftime('%Y-%m-%d')
+
+# (格式名, 匹配函数, 解析函数)，各类互斥
+DATE_FORMATS = [
+    ('ym_dash', lambda s: s.str.match(r'^\d{4}-\d{2}$'), _parse_ym_dash),                  # 2024-01
+    ('ymd', lambda s: s.str.match(r'^\d{4}-\d{2}-\d{2}$'), _parse_ymd),                    # 2024-01-31
+    ('ym_compact', lambda s: s.str.isdigit() & (s.str.len() == 6), _parse_ym_compact),     # 202401
+    ('ym_dot', lambda s: s.str.match(r'^\d{4}\.\d{1,2}$'), _parse_ym_dot),                 # 2024.1
+    ('quarter', _match_quarter, _parse_quarter),                                           # 2024年第1季度 / 2024Q1
+    ('cn_ym', lambda s: s.str.match(r'^\d{4}年\d{1,2}月(?:份)?$'), _parse_cn_ym),          # 2024年1月份
+    ('ymd_hms', lambda s: s.str.match(r'^\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}$'), _parse_ymd_hms),
+]
+
+# 各 akshare 接口检测到的日期格式（持久化，下次运行优先按已知格式解析）
+DATE_FORMAT_CACHE_FILE = os.path.join(CACHE_DIR, "date_formats.json")
+_date_format_cache = None
+_date_format_lock = threading.Lock()
+
+def _get_date_format_cache():
+    global _date_format_cache
+    with _date_format_lock:
+        if _date_format_cache is None:
+            _date_format_cache = {}
+            if os.path.exists(DATE_FORMAT_CACHE_FILE):
+                try:
+                    with open(DATE_FORMAT_CACHE_FILE, 'r', encoding='utf-8') as f:
+                        _date_format_cache = json.load(f)
+                except: pass
+        return _date_format_cache
+
+def save_date_format_cache():
+    cache = _get_date_format_cache()
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    with _date_format_lock:
+        with open(DATE_FORMAT_CACHE_FILE, 'w', encoding='utf-8') as f:
+            json.dump(cache, f, ensure_ascii=False, indent=2)
+
+def normalize_dates(values, source=None):
+    """
+    向量化版 smart_date_parser：返回 'YYYY-MM-DD' 字符串或 None 组成的 Series
+    source 为 akshare 接口名时，优先按该接口上次检测到的格式解析，命中即跳过其余格式检测
+    """
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values.dt.strftime('%Y-%m-%d').astype(object).where(values.notna(), None)
+
+    s = values.astype(str).str.strip()
+    result = pd.Series(None, index=values.index, dtype=object)
+    pending = pd.Series(True, index=values.index)
+
+    cache = _get_date_format_cache()
+    known = cache.get(source, []) if source else []
+    ordered = sorted(DATE_FORMATS, key=lambda f: known.index(f[0]) if f[0] in known else len(known))
+
+    detected = []
+    for name, matcher, parser in ordered:
+        if not pending.any(): break
+        mask = pending & matcher(s).fillna(False).astype(bool)
+        if not mask.any(): continue
+        parsed = parser(s[mask])
+        ok = parsed.notna()
+        result[ok[ok].index] = parsed[ok]
+        pending[ok[ok].index] = False
+        detected.append(name)
+
+    # 无法识别或解析失败的行：逐行回退，保证与原解析器行为一致
+    if pending.any():
+        result[pending] = values[pending].apply(smart_date_parser)
+
+    if source and detected and detected != known[:len(detected)]:
+        with _date_format_lock:
+            cache[source] = detected
+    return result
+
+# 金标样例：覆盖 akshare 各接口出现过的日期写法
+DATE_GOLDEN_SAMPLES = [
+    '2024-01', '2024-12', '2024-01-31', '2023-02-29', '202401', '202412',
+    '2024.1', '2024.10', '2024年第1季度', '2023年第2季度', '2021年第3季度', '2022年第四季度',
+    '2024Q2', '2019Q4', '2024年1月', '2024年01月份', '2024年12月份',
+    '2024-01-31 00:00:00', '2024/01/31', '2024年1月1日', ' 2024-03 ', '', 'nan', '--',
+    None, float('nan'), pd.Timestamp('2024-05-31'), pd.Timestamp('2024-05-31').date(), 202403,
+]
+
+def check_date_normalizer():
+    """金标校验：normalize_dates 与 smart_date_parser 输出逐项一致"""
+    samples = pd.Series(DATE_GOLDEN_SAMPLES, dtype=object)
+    expected = samples.apply(smart_date_parser).tolist()
+    actual = normalize_dates(samples).tolist()
+    mismatches = [(v, e, a) for v, e, a in zip(DATE_GOLDEN_SAMPLES, expected, actual)
+                  if e != a and not (pd.isna(e) and pd.isna(a))]
+    for v, e, a in mismatches:
+        print(f"   ❌ {v!r}: 期望 {e!r}, 实际 {a!r}")
+    print(f"{'✅' if not mismatches else '❌'} 日期解析金标校验: {len(samples) - len(mismatches)}/{len(samples)} 一致")
+    return not mismatches
+
+NUMERIC_GOLDEN_SAMPLES = ['1.5', '2.3%', '1,234.5', '12亿', ' 3.0 ', '-0.7%', '', '--', None, float('nan'), 4, 5.25, 'abc']
+
+def check_numeric_cleaner():
+    """金标校验：clean_numeric 与 clean_value 输出逐项一致"""
+    samples = pd.Series(NUMERIC_GOLDEN_SAMPLES, dtype=object)
+    expected = [clean_value(v) for v in NUMERIC_GOLDEN_SAMPLES]
+    actual = clean_numeric(samples).tolist()
+    mismatches = [(v, e, a) for v, e, a in zip(NUMERIC_GOLDEN_SAMPLES, expected, actual)
+                  if not (e == a or (pd.isna(e) and pd.isna(a)))]
+    for v, e, a in mismatches:
+        print(f"   ❌ {v!r}: 期望 {e!r}, 实际 {a!r}")
+    print(f"{'✅' if not mismatches else '❌'} 数值清洗金标校验: {len(samples) - len(mismatches)}/{len(samples)} 一致")
+    return not mismatches
+
+def benchmark_clean_value(rows=10000, repeat=5):
+    """微基准：逐行 apply(clean_value) vs 整列 clean_numeric"""
+    rng = np.random.default_rng(0)
+    raw = rng.normal(100, 50, rows)
+    frame = pd.DataFrame({
+        'pct': [f"{v:.2f}%" for v in raw],
+        'money': [f"{v * 1000:,.1f}亿" for v in raw],
+        'text': [f"{v:.4f}" for v in raw],
+        'plain': raw,
+    })
+    print(f"📏 数值清洗基准 ({rows} 行 × {len(frame.columns)} 列, 取 {repeat} 次最优)")
+    for col in frame.columns:
+        t_apply = min(_timeit(lambda: frame[col].apply(clean_value)) for _ in range(repeat))
+        t_vec = min(_timeit(lambda: clean_numeric(frame[col])) for _ in range(repeat))
+        same = np.allclose(frame[col].apply(clean_value).astype(float), clean_numeric(frame[col]), equal_nan=True)
+        print(f"   {col:<6} apply {t_apply * 1000:7.1f}ms | 向量化 {t_vec * 1000:6.1f}ms | 加速 {t_apply / t_vec:5.1f}x | 结果一致 {same}")
+
+def _timeit(func):
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
 # ==========================================
-# 3. 数据获取主逻辑
+# 3. 并发调度配置
 # ==========================================
-def fetch_macro_data_v23():
-    print("🚀 启动全量获取脚本 (v23.0 瘦身优化版)...")
-    print(f"📦 数据结构已优化: 移除冗余 label 字段")
-    print("-" * 60)
-    export_data = {}
+# 并发线程数：可通过环境变量 MACRO_FETCH_WORKERS 或命令行 --workers=N 调整，1 即串行
+FETCH_WORKERS = int(os.environ.get('MACRO_FETCH_WORKERS', '6'))
 
-    # 1. 价格
-    print("\n>>> [1. 价格组]")
-    try:
-        df = ak.macro_china_cpi_monthly()
-        col_d = find_possible_columns(df.columns, [['日期'], ['月份']])
-        col_v = find_possible_columns(df.columns, [['今值'], ['CPI', '同比']])
-        if col_d and col_v:
-            df['date'] = df[col_d].apply(smart_date_parser)
-            df['value'] = df[col_v].apply(clean_value)
-            # 瘦身关键: 只取 date 和 value，不加 label
-            res = df.dropna(subset=['value','date']).sort_values('date')[['date','value']].to_dict('records')
-            export_data['cpi'] = res
-            print(f"✅ CPI: {len(res)} 条")
-        else: raise Exception("CPI列名错")
-    except Exception as e:
-        print(f"❌ CPI失败: {e}")
-        export_data['cpi'] = []
+# 同一数据源两次请求的最小间隔（秒），防止并发请求触发风控
+SOURCE_MIN_INTERVAL = {
+    'jin10': 0.5,      # 金十数据（CPI/PPI/GDP/PMI/出口）
+    'eastmoney': 0.5,  # 东方财富数据中心
+    'sina': 0.5,       # 新浪行情
+    'legu': 1.0,       # 乐咕乐股
+    'safe': 1.0,       # 外汇管理局
+    'sge': 1.0,        # 上海黄金交易所
+    'nifd': 1.0,       # 国家金融与发展实验室
+}
+DEFAULT_MIN_INTERVAL = 0.5
 
-    try:
-        df = ak.macro_china_ppi_yearly()
-        col_d = find_possible_columns(df.columns, [['日期'], ['月份']])
-        col_v = find_possible_columns(df.columns, [['今值'], ['PPI', '同比']])
-        if col_d and col_v:
-            df['date'] = df[col_d].apply(smart_date_parser)
-            df['value'] = df[col_v].apply(clean_value)
-            res = df.dropna(subset=['value','date']).sort_values('date')[['date','value']].to_dict('records')
-            export_data['ppi'] = res
-            print(f"✅ PPI: {len(res)} 条")
-        else: raise Exception("PPI列名错")
-    except Exception as e:
-        print(f"❌ PPI失败: {e}")
-        export_data['ppi'] = []
 
-    # 2. 货币
-    print("\n>>> [2. 货币与利率组]")
-    try:
-        df = ak.macro_china_money_supply()
-        col_d = find_possible_columns(df.columns, [['月份'], ['日期']])
-        col_m2 = find_column(df.columns, ['M2','同比'])
-        col_m1 = find_column(df.columns, ['M1','同比'])
-        if col_d and col_m2 and col_m1:
-            df['date'] = df[col_d].apply(smart_date_parser)
-            df['m2'] = df[col_m2].apply(clean_value)
-            df['m1'] = df[col_m1].apply(clean_value)
-            df['sci'] = df['m1'] - df['m2']
-            df = df.dropna(subset=['m2','m1','date']).sort_values('date')
-            export_data['m2'] = df[['date','m2']].rename(columns={'m2':'value'}).to_dict('records')
-            export_data['m1'] = df[['date','m1']].rename(columns={'m1':'value'}).to_dict('records')
-            export_data['scissors'] = df[['date','sci']].rename(columns={'sci':'value'}).to_dict('records')
-            print(f"✅ M1/M2: {len(df)} 条")
-        else: raise Exception("Money列名错")
-    except Exception as e:
-        print(f"❌ M1/M2失败: {e}")
-        export_data['m2'], export_data['m1'], export_data['scissors'] = [], [], []
+_print_lock = threading.Lock()
 
-    try:
-        df = ak.macro_china_shrzgm()
-        col_d = find_possible_columns(df.columns, [['月份'], ['日期']])
-        col_v = find_column(df.columns, ['增量'])
-        if col_d and col_v:
-            df['date'] = df[col_d].apply(smart_date_parser)
-            df['value'] = df[col_v].apply(clean_value)
-            res = df.dropna(subset=['value','date']).sort_values('date')[['date','value']].to_dict('records')
-            export_data['social_financing'] = res
-            print(f"✅ 社融增量: {len(res)} 条")
-        else: raise Exception("社融列名错")
-    except Exception as e:
-        print(f"❌ 社融失败: {e}")
-        export_data['social_financing'] = []
+def log(msg):
+    """线程安全输出，避免并发获取时多行日志交错"""
+    with _print_lock:
+        print(msg, flush=True)
 
-    try:
-        df = ak.macro_china_lpr()
-        col_d = find_column(df.columns, ['日期']) or find_column(df.columns, ['TRADE_DATE'])
-        col_1y = find_possible_columns(df.columns, [['1年'], ['LPR1Y']])
-        col_5y = find_possible_columns(df.columns, [['5年'], ['LPR5Y']])
-        if col_d and col_1y and col_5y:
-            df['date'] = df[col_d].apply(smart_date_parser)
-            df['val_1y'] = df[col_1y].apply(clean_value)
-            df['val_5y'] = df[col_5y].apply(clean_value)
-            df = df.dropna(subset=['val_1y', 'val_5y', 'date']).sort_values('date')
-            export_data['lpr_1y'] = df[['date', 'val_1y']].rename(columns={'val_1y':'value'}).to_dict('records')
-            export_data['lpr_5y'] = df[['date', 'val_5y']].rename(columns={'val_5y':'value'}).to_dict('records')
-            print(f"✅ LPR利率: {len(df)} 条")
-        else: raise Exception("LPR列名错")
-    except Exception as e:
-        print(f"❌ LPR利率失败: {e}")
-        export_data['lpr_1y'], export_data['lpr_5y'] = [], []
 
-    # 3. 增长
-    print("\n>>> [3. 增长组]")
-    try:
-        df = ak.macro_china_gdp_yearly()
-        col_d = find_possible_columns(df.columns, [['日期'], ['季度']])
-        col_v = find_possible_columns(df.columns, [['今值'], ['国内生产总值','同比']])
-        if col_d and col_v:
-            df['date'] = df[col_d].apply(smart_date_parser)
-            df['value'] = df[col_v].apply(clean_value)
-            res = df.dropna(subset=['value','date']).sort_values('date')[['date','value']].to_dict('records')
-            export_data['gdp'] = res
-            print(f"✅ GDP: {len(res)} 条")
-        else: raise Exception("GDP列名错")
-    except Exception as e:
-        print(f"❌ GDP失败: {e}")
-        export_data['gdp'] = []
+class SourceRateLimiter:
+    """按数据源限速：同源请求串行排队，不同数据源之间互不阻塞"""
 
-    try:
-        df = ak.macro_china_pmi_yearly()
-        col_d = find_column(df.columns, ['日期'])
-        col_v = find_column(df.columns, ['今值'])
-        if col_d and col_v:
-            df['date'] = df[col_d].apply(smart_date_parser)
-            df['value'] = df[col_v].apply(clean_value)
-            res = df.dropna(subset=['value','date']).sort_values('date')[['date','value']].to_dict('records')
-            export_data['pmi'] = res
-            print(f"✅ PMI: {len(res)} 条")
-        else: raise Exception("PMI列名错")
-    except Exception as e:
-        print(f"❌ PMI失败: {e}")
-        export_data['pmi'] = []
+    def __init__(self, intervals, default_interval=DEFAULT_MIN_INTERVAL):
+        self.intervals = intervals
+        self.default_interval = default_interval
+        self._locks = {}
+        self._last_call = {}
+        self._guard = threading.Lock()
 
-    try:
-        df = ak.macro_china_exports_yoy()
-        col_d = find_column(df.columns, ['日期'])
-        col_v = find_column(df.columns, ['今值'])
-        if col_d and col_v:
-            df['date'] = df[col_d].apply(smart_date_parser)
-            df['value'] = df[col_v].apply(clean_value)
-            res = df.dropna(subset=['value','date']).sort_values('date')[['date','value']].to_dict('records')
-            export_data['exports_yoy'] = res
-            print(f"✅ 出口: {len(res)} 条")
-        else: raise Exception("出口列名错")
-    except Exception as e:
-        print(f"❌ 出口失败: {e}")
-        export_data['exports_yoy'] = []
+    def _get_lock(self, source):
+        with self._guard:
+            if source not in self._locks:
+                self._locks[source] = threading.Lock()
+            return self._locks[source]
 
-    # 4. 消费
-    print("\n>>> [4. 消费组]")
-    try:
-        df = ak.macro_china_consumer_goods_retail()
-        col_d = find_possible_columns(df.columns, [['月份'], ['日期']])
-        col_v = find_column(df.columns, ['同比增长']) 
-        if not col_v: col_v = find_column(df.columns, ['当月', '同比'])
-        if col_d and col_v:
-            df['date'] = df[col_d].apply(smart_date_parser)
-            df['value'] = df[col_v].apply(clean_value)
-            res = df.dropna(subset=['value','date']).sort_values('date')[['date','value']].to_dict('records')
-            export_data['retail_sales'] = res
-            print(f"✅ 社消: {len(res)} 条")
-        else: raise Exception("社消列名错")
-    except Exception as e:
-        print(f"❌ 社消失败: {e}")
-        export_data['retail_sales'] = []
-    
-    # 5. 市场
-    print("\n>>> [5. 市场与估值组]")
-    try:
-        df_idx = ak.stock_zh_index_daily(symbol="sh000001")
-        if 'date' in df_idx.columns:
-            df_idx['date'] = pd.to_datetime(df_idx['date'])
-            try: df_m_idx = df_idx.resample('ME', on='date').last().reset_index()
-            except: df_m_idx = df_idx.set_index('date').resample('M').last().reset_index()
-            df_m_idx['date'] = df_m_idx['date'].dt.strftime('%Y-%m-%d')
-            # 移除 label
-            export_data['sh_index'] = df_m_idx[['date','close']].rename(columns={'close':'value'}).to_dict('records')
-            print(f"✅ 上证点位: {len(df_m_idx)} 条")
-        else: export_data['sh_index'] = []
-    except Exception as e:
-        print(f"❌ 上证点位失败: {e}")
-        export_data['sh_index'] = []
+    def wait(self, source):
+        """阻塞到该数据源允许下一次请求为止"""
+        interval = self.intervals.get(source, self.default_interval)
+        with self._get_lock(source):
+            elapsed = time.monotonic() - self._last_call.get(source, 0)
+            if elapsed < interval:
+                time.sleep(interval - elapsed)
+            self._last_call[source] = time.monotonic()
 
-    # 乐咕 PE/PB
-    try:
-        df_pe = ak.stock_market_pe_lg(symbol="上证")
-        if '日期' in df_pe.columns and '平均市盈率' in df_pe.columns:
-            df_pe['date'] = pd.to_datetime(df_pe['日期'])
-            df_pe['value'] = df_pe['平均市盈率'].apply(clean_value)
-            try: df_m = df_pe.resample('ME', on='date').last().reset_index()
-            except: df_m = df_pe.set_index('date').resample('M').last().reset_index()
-            df_m['date'] = df_m['date'].dt.strftime('%Y-%m-%d')
-            export_data['sh_index_pe'] = df_m[['date','value']].to_dict('records')
-            print(f"✅ 上证PE (Legu): {len(df_m)} 条")
-        else: raise Exception("PE列名错")
-    except: export_data['sh_index_pe'] = []
+# ==========================================
+# 4. 指标注册表
+# ==========================================
+# key 与 INDICATOR_MAP 一一对应，每项声明：
+#   func / kwargs : akshare 接口名及参数（相同接口+参数的指标只请求一次）
+#   source        : 数据源，用于限速
+#   freq          : monthly / quarterly / daily（日频按月末重采样）
+#   date_cols     : 日期列关键词组
+#   value_cols    : 数值列关键词组；derive=(a, b) 表示 value = a - b
+#   row_filter    : (列名, 关键词)，只保留该列包含关键词的行
+INDICATOR_REGISTRY = {
+    # --- 价格 ---
+    'cpi': {'func': 'macro_china_cpi_monthly', 'source': 'jin10', 'freq': 'monthly',
+            'date_cols': [['日期'], ['月份']], 'value_cols': [['今值'], ['CPI', '同比']]},
+    'ppi': {'func': 'macro_china_ppi_yearly', 'source': 'jin10', 'freq': 'monthly',
+            'date_cols': [['日期'], ['月份']], 'value_cols': [['今值'], ['PPI', '同比']]},
+
+    # --- 货币 ---
+    'm2': {'func': 'macro_china_money_supply', 'source': 'eastmoney', 'freq': 'monthly',
+           'date_cols': [['月份'], ['日期']], 'value_cols': [['M2', '同比']]},
+    'm1': {'func': 'macro_china_money_supply', 'source': 'eastmoney', 'freq': 'monthly',
+           'date_cols': [['月份'], ['日期']], 'value_cols': [['M1', '同比']]},
+    'scissors': {'func': 'macro_china_money_supply', 'source': 'eastmoney', 'freq': 'monthly',
+                 'date_cols': [['月份'], ['日期']], 'derive': ('m1', 'm2')},
+    'social_financing': {'func': 'macro_china_shrzgm', 'source': 'eastmoney', 'freq': 'monthly',
+                         'date_cols': [['月份'], ['日期']], 'value_cols': [['增量']]},
+    'lpr_1y': {'func': 'macro_china_lpr', 'source': 'eastmoney', 'freq': 'monthly',
+               'date_cols': [['日期'], ['TRADE_DATE']], 'value_cols': [['1年'], ['LPR1Y']]},
+    'lpr_5y': {'func': 'macro_china_lpr', 'source': 'eastmoney', 'freq': 'monthly',
+               'date_cols': [['日期'], ['TRADE_DATE']], 'value_cols': [['5年'], ['LPR5Y']]},
+
+    # --- 增长 ---
+    'gdp': {'func': 'macro_china_gdp_yearly', 'source': 'jin10', 'freq': 'quarterly',
+            'date_cols': [['日期'], ['季度']], 'value_cols': [['今值'], ['国内生产总值', '同比']]},
+    'pmi': {'func': 'macro_china_pmi_yearly', 'source': 'jin10', 'freq': 'monthly',
+            'date_cols': [['日期']], 'value_cols': [['今值']]},
+    'exports_yoy': {'func': 'macro_china_exports_yoy', 'source': 'jin10', 'freq': 'monthly',
+                    'date_cols': [['日期']], 'value_cols': [['今值']]},
+
+    # --- 消费 ---
+    'retail_sales': {'func': 'macro_china_consumer_goods_retail', 'source': 'eastmoney', 'freq': 'monthly',
+                     'date_cols': [['月份'], ['日期']], 'value_cols': [['同比增长'], ['当月', '同比']]},
+
+    # --- 市场 ---
+    'sh_index': {'func': 'stock_zh_index_daily', 'kwargs': {'symbol': 'sh000001'}, 'source': 'sina',
+                 'freq': 'daily', 'date_cols': [['date']], 'value_cols': [['close']]},
+    'sh_index_pe': {'func': 'stock_market_pe_lg', 'kwargs': {'symbol': '上证'}, 'source': 'legu',
+                    'freq': 'daily', 'date_cols': [['日期']], 'value_cols': [['平均市盈率']]},
+    'sh_index_pb': {'func': 'stock_market_pb_lg', 'kwargs': {'symbol': '上证'}, 'source': 'legu',
+                    'freq': 'daily', 'date_cols': [['日期']], 'value_cols': [['市净率']]},
+    'us_bond_10y': {'func': 'bond_zh_us_rate', 'source': 'eastmoney', 'freq': 'daily',
+                    'date_cols': [['日期']], 'value_cols': [['美国', '10年']]},
+    'cn_bond_10y': {'func': 'bond_zh_us_rate', 'source': 'eastmoney', 'freq': 'daily',
+                    'date_cols': [['日期']], 'value_cols': [['中国', '10年']]},
+    'bond_spread': {'func': 'bond_zh_us_rate', 'source': 'eastmoney', 'freq': 'daily',
+                    'date_cols': [['日期']], 'derive': ('cn_bond_10y', 'us_bond_10y')},
+    'usd_cny': {'func': 'currency_boc_safe', 'source': 'safe', 'freq': 'daily',
+                'date_cols': [['日期'], ['发布日期']], 'value_cols': [['美元']]},
+    'fx_reserves': {'func': 'macro_china_fx_gold', 'source': 'eastmoney', 'freq': 'monthly',
+                    'date_cols': [['月份']], 'value_cols': [['国家外汇储备', '数值'], ['外汇储备', '数值']]},
+    'gold': {'func': 'spot_hist_sge', 'kwargs': {'symbol': 'Au99.99'}, 'source': 'sge',
+             'freq': 'daily', 'date_cols': [['date']], 'value_cols': [['close']]},
+
+    # --- 结构 ---
+    'resident_leverage': {'func': 'macro_cnbs', 'source': 'nifd', 'freq': 'quarterly',
+                          'date_cols': [['年份']], 'value_cols': [['居民部门']]},
+    'real_estate_invest': {'func': 'macro_china_real_estate', 'source': 'eastmoney', 'freq': 'monthly',
+                           'date_cols': [['日期']], 'value_cols': [['最新值'], ['指数']]},
+    'unemployment': {'func': 'macro_china_urban_unemployment', 'source': 'eastmoney', 'freq': 'monthly',
+                     'date_cols': [['date'], ['日期']], 'value_cols': [['value'], ['失业率']],
+                     'row_filter': ('item', '全国')},
+}
 
+# ==========================================
+# 5. 数据获取引擎
+# ==========================================
+def _resolve_month_end_freq():
+    """pandas>=2.2 用 'ME' 表示月末，旧版本只认 'M'；启动时判定一次"""
     try:
-        df_pb = ak.stock_market_pb_lg(symbol="上证")
-        if '日期' in df_pb.columns and '市净率' in df_pb.columns:
-            df_pb['date'] = pd.to_datetime(df_pb['日期'])
-            df_pb['value'] = df_pb['市净率'].apply(clean_value)
-            try: df_m = df_pb.resample('ME', on='date').last().reset_index()
-            except: df_m = df_pb.set_index('date').resample('M').last().reset_index()
-            df_m['date'] = df_m['date'].dt.strftime('%Y-%m-%d')
-            export_data['sh_index_pb'] = df_m[['date','value']].to_dict('records')
-            print(f"✅ 上证PB (Legu): {len(df_m)} 条")
-        else: raise Exception("PB列名错")
-    except: export_data['sh_index_pb'] = []
-
-    # 债市
+        pd.tseries.frequencies.to_offset('ME')
+        return 'ME'
+    except ValueError:
+        return 'M'
+
+MONTH_END_FREQ = _resolve_month_end_freq()
+
+def build_fetch_groups(keys):
+    """把共享同一接口调用（func + kwargs）的指标归为一组，每组只请求一次"""
+    groups = {}
+    for key in keys:
+        entry = INDICATOR_REGISTRY[key]
+        signature = (entry['func'], tuple(sorted(entry.get('kwargs', {}).items())))
+        groups.setdefault(signature, []).append(key)
+    return list(groups.values())
+
+def process_indicator_group(df, keys):
+    """
+    对一次接口返回执行 列定位 → 日期解析 → 数值清洗 → 去空排序 → (日频)月末重采样
+    同组指标共用日期列，任一数值缺失的行整体丢弃，返回 {key: 记录列表}
+    """
+    entry = INDICATOR_REGISTRY[keys[0]]
+    df.columns = [str(c).strip() for c in df.columns]
+
+    col_d = find_possible_columns(df.columns, entry['date_cols'])
+    if not col_d: raise Exception("日期列名错")
+
+    row_filter = entry.get('row_filter')
+    if row_filter and row_filter[0] in df.columns:
+        df = df[df[row_filter[0]].astype(str).str.contains(row_filter[1], na=False)]
+
+    is_daily = entry['freq'] == 'daily'
+    frame = pd.DataFrame(index=df.index)
+    frame['date'] = pd.to_datetime(df[col_d]) if is_daily else normalize_dates(df[col_d], source=entry['func'])
+
+    for key in keys:
+        value_cols = INDICATOR_REGISTRY[key].get('value_cols')
+        if not value_cols: continue
+        col_v = find_possible_columns(df.columns, value_cols)
+        if not col_v: raise Exception(f"{key}列名错")
+        frame[key] = clean_numeric(df[col_v])
+
+    for key in keys:
+        derive = INDICATOR_REGISTRY[key].get('derive')
+        if derive: frame[key] = frame[derive[0]] - frame[derive[1]]
+
+    frame = frame.dropna(subset=['date', *keys]).sort_values('date')
+    if is_daily:
+        frame = frame.resample(MONTH_END_FREQ, on='date').last().reset_index()
+        frame = frame.dropna(subset=keys)
+        frame['date'] = frame['date'].dt.strftime('%Y-%m-%d')
+
+    return {key: frame[['date', key]].rename(columns={key: 'value'}).to_dict('records') for key in keys}
+
+def fetch_indicator_group(keys, limiter):
+    """请求并处理一组指标（限速 + 计时），失败时该组全部返回空列表"""
+    entry = INDICATOR_REGISTRY[keys[0]]
+    limiter.wait(entry['source'])
+    start = time.perf_counter()
     try:
-        df = ak.bond_zh_us_rate()
-        col_d = find_column(df.columns, ['日期'])
-        col_us = find_column(df.columns, ['美国', '10年'])
-        col_cn = find_column(df.columns, ['中国', '10年'])
-        if col_d and col_us and col_cn:
-            df['date'] = pd.to_datetime(df[col_d])
-            df['us'] = df[col_us].apply(clean_value)
-            df['cn'] = df[col_cn].apply(clean_value)
-            df['spread'] = df['cn'] - df['us']
-            df = df.dropna(subset=['us','cn','date']).sort_values('date')
-            try: df_m = df.resample('ME', on='date').last().reset_index()
-            except: df_m = df.set_index('date').resample('M').last().reset_index()
-            df_m['date'] = df_m['date'].dt.strftime('%Y-%m-%d')
-            export_data['us_bond_10y'] = df_m[['date','us']].rename(columns={'us':'value'}).to_dict('records')
-            export_data['cn_bond_10y'] = df_m[['date','cn']].rename(columns={'cn':'value'}).to_dict('records')
-            export_data['bond_spread'] = df_m[['date','spread']].rename(columns={'spread':'value'}).to_dict('records')
-            print(f"✅ 债市: {len(df_m)} 条")
-        else: raise Exception("债市列名错")
+        df = getattr(ak, entry['func'])(**entry.get('kwargs', {}))
+        result = process_indicator_group(df, keys)
+        log(f"✅ {'/'.join(keys)}: {len(result[keys[0]])} 条 ({time.perf_counter() - start:.1f}s)")
     except Exception as e:
-        print(f"❌ 债市失败: {e}")
-        export_data['us_bond_10y'], export_data['cn_bond_10y'], export_data['bond_spread'] = [], [], []
+        log(f"❌ {'/'.join(keys)} 失败: {e}")
+        result = {key: [] for key in keys}
+    return result, time.perf_counter() - start
 
-    # 汇率
-    try:
-        df = ak.currency_boc_safe()
-        col_d = find_possible_columns(df.columns, [['日期'], ['发布日期']])
-        col_usd = find_column(df.columns, ['美元'])
-        if col_d and col_usd:
-            df['date'] = pd.to_datetime(df[col_d])
-            df['value'] = df[col_usd].apply(clean_value)
-            df = df.dropna(subset=['value']).sort_values('date')
-            try: df_m = df.resample('ME', on='date').last().reset_index()
-            except: df_m = df.set_index('date').resample('M').last().reset_index()
-            df_m['date'] = df_m['date'].dt.strftime('%Y-%m-%d')
-            export_data['usd_cny'] = df_m[['date','value']].to_dict('records')
-            print(f"✅ 汇率: {len(df_m)} 条")
-        else: raise Exception("汇率列名错")
-    except: export_data['usd_cny'] = []
-
-    # 外储
-    try:
-        df = ak.macro_china_fx_gold()
-        col_d = find_column(df.columns, ['月份'])
-        col_v = find_possible_columns(df.columns, [['国家外汇储备', '数值'], ['外汇储备', '数值']])
-        if col_d and col_v:
-            df['date'] = df[col_d].apply(smart_date_parser)
-            df['value'] = df[col_v].apply(clean_value)
-            res = df.dropna(subset=['value','date']).sort_values('date')[['date','value']].to_dict('records')
-            export_data['fx_reserves'] = res
-            print(f"✅ 外储: {len(res)} 条")
-        else: raise Exception("外储列名错")
-    except: export_data['fx_reserves'] = []
-
-    # 黄金
-    try:
-        df = ak.spot_hist_sge(symbol="Au99.99")
-        if 'date' in df.columns:
-            df['date'] = pd.to_datetime(df['date'])
-            try: df_m = df.resample('ME', on='date').last().reset_index()
-            except: df_m = df.set_index('date').resample('M').last().reset_index()
-            df_m['date'] = df_m['date'].dt.strftime('%Y-%m-%d')
-            df_m['value'] = df_m['close']
-            res = df_m[['date','value']].to_dict('records')
-            export_data['gold'] = res
-            print(f"✅ 黄金: {len(res)} 条")
-        else: raise Exception("黄金列名错")
-    except: export_data['gold'] = []
-
-    # 6. 结构
-    print("\n>>> [6. 结构组]")
-    try:
-        df = ak.macro_cnbs()
-        if '年份' in df.columns and '居民部门' in df.columns:
-            df['date'] = df['年份'].apply(smart_date_parser)
-            df['value'] = df['居民部门'].apply(clean_value)
-            res = df.dropna(subset=['value','date']).sort_values('date')[['date','value']].to_dict('records')
-            export_data['resident_leverage'] = res
-            print(f"✅ 居民杠杆: {len(res)} 条")
-        else: raise Exception("居民杠杆列名错")
-    except: export_data['resident_leverage'] = []
+def fetch_macro_data_v23(workers=FETCH_WORKERS, force=False):
+    print("🚀 启动全量获取脚本 (v23.0 瘦身优化版)...")
+    print(f"📦 数据结构已优化: 移除冗余 label 字段")
+    mode = f"并发 {workers} 线程" if workers > 1 else "串行"
+    print(f"⚡ 获取模式: {mode}")
+    print("-" * 60)
 
-    try:
-        df = ak.macro_china_real_estate()
-        col_d = find_column(df.columns, ['日期'])
-        col_v = find_column(df.columns, ['最新值']) or find_column(df.columns, ['指数'])
-        if col_d and col_v:
-            df['date'] = df[col_d].apply(smart_date_parser)
-            df['value'] = df[col_v].apply(clean_value)
-            res = df.dropna(subset=['value','date']).sort_values('date')[['date','value']].to_dict('records')
-            export_data['real_estate_invest'] = res
-            print(f"✅ 国房景气: {len(res)} 条")
-        else: raise Exception("国房景气列名错")
-    except: export_data['real_estate_invest'] = []
+    unregistered = [k for k in INDICATOR_MAP if k not in INDICATOR_REGISTRY]
+    if unregistered: print(f"⚠️ 未注册的指标: {unregistered}")
 
-    try:
-        df = ak.macro_china_urban_unemployment()
-        df.columns = df.columns.str.strip()
-        col_d = find_possible_columns(df.columns, [['date'], ['日期']])
-        col_v = find_possible_columns(df.columns, [['value'], ['失业率']])
-        if col_d and col_v:
-            df['date'] = df[col_d].apply(smart_date_parser)
-            df['value'] = df[col_v].apply(clean_value)
-            if 'item' in df.columns:
-                df = df[df['item'].str.contains('全国', na=False)]
-            res = df.dropna(subset=['value','date']).sort_values('date')[['date','value']].to_dict('records')
-            export_data['unemployment'] = res
-            print(f"✅ 失业率: {len(res)} 条")
-        else: raise Exception("失业率列名错")
-    except: export_data['unemployment'] = []
+    # 发布日历：整组指标都未到发布窗口时跳过该接口（--force 忽略日历）
+    stores = {key: load_indicator_store(key) for key in INDICATOR_MAP}
+    today = pd.Timestamp.now().normalize()
+    not_due = {}
+    for key in INDICATOR_MAP:
+        due, expected = is_indicator_due(key, stores[key], today)
+        if not due and not force:
+            not_due[key] = expected
+
+    all_groups = build_fetch_groups([k for k in INDICATOR_MAP if k in INDICATOR_REGISTRY])
+    groups = [keys for keys in all_groups if not all(k in not_due for k in keys)]
+    skipped = [k for keys in all_groups if keys not in groups for k in keys]
+    if skipped:
+        print(f"⏭️ 未到发布窗口，跳过 {len(skipped)} 项: " +
+              ", ".join(f"{k}(预计 {not_due[k]:%m-%d})" for k in skipped))
+    print(f"📡 本次请求 {len(groups)}/{len(all_groups)} 个接口")
+
+    limiter = SourceRateLimiter(SOURCE_MIN_INTERVAL)
+    wall_start = time.perf_counter()
+    results = [None] * len(groups)
+
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(fetch_indicator_group, keys, limiter): i for i, keys in enumerate(groups)}
+            for future in as_completed(futures):
+                results[futures[future]] = future.result()
+    else:
+        for i, keys in enumerate(groups):
+            results[i] = fetch_indicator_group(keys, limiter)
+
+    fetched = {}
+    timings = {}
+    for keys, (result, elapsed) in zip(groups, results):
+        fetched.update(result)
+        timings['/'.join(keys)] = elapsed
+    export_data = apply_indicator_store(fetched, stores, skipped)
+    save_date_format_cache()
+
+    wall = time.perf_counter() - wall_start
+    if timings:
+        slowest = max(timings, key=timings.get)
+        print(f"\n⏱️ 获取耗时: {wall:.1f}s (接口耗时合计 {sum(timings.values()):.1f}s, 最慢 {slowest} {timings[slowest]:.1f}s)")
 
     # Meta
     export_data["meta"] = {
@@ -447,15 +596,457 @@ def fetch_macro_data_v23():
     return export_data
 
 # ==========================================
-# 3. 校验与生成
+# 6. 指标本地存储（增量合并 + 失败兜底）
+# ==========================================
+# 每个指标一个文件：{last_date, hash, updated_at, series}
+INDICATOR_STORE_DIR = os.path.join(CACHE_DIR, "indicators")
+
+def _series_hash(series):
+    return hashlib.md5(json.dumps(series, ensure_ascii=False, sort_keys=True).encode()).hexdigest()[:16]
+
+def load_indicator_store(key):
+    path = os.path.join(INDICATOR_STORE_DIR, f"{key}.json")
+    if os.path.exists(path):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except: pass
+    return None
+
+def save_indicator_store(key, series):
+    os.makedirs(INDICATOR_STORE_DIR, exist_ok=True)
+    store = {
+        'last_date': series[-1]['date'],
+        'hash': _series_hash(series),
+        'updated_at': pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'series': series,
+    }
+    path = os.path.join(INDICATOR_STORE_DIR, f"{key}.json")
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(store, f, ensure_ascii=False)
+
+def merge_indicator_series(stored, fetched):
+    """
+    以已存序列的最后日期为水位线合并：水位线之前沿用本地数据，水位线及之后取新数据
+    （水位线当天也覆盖，因为日频重采样的当月末值在月内会持续变化）
+    接口返回的序列截断/滞后、结束得比水位线早时，本地比新数据更晚的部分保留，序列不会变短
+    """
+    if not stored: return fetched
+    if not fetched: return stored
+    watermark, fetched_end = stored[-1]['date'], fetched[-1]['date']
+    kept = [r for r in stored if r['date'] < watermark or r['date'] > fetched_end]
+    return sorted(kept + [r for r in fetched if r['date'] >= watermark], key=lambda r: r['date'])
+
+# 金标样例：(已存日期, 新获取日期, 期望合并结果日期)；值取 's'/'f' 标记来源，水位线及之后以新数据为准
+INDICATOR_MERGE_GOLDEN_SAMPLES = [
+    (['2024-01', '2024-02', '2024-03'], ['2024-03', '2024-04'], [('2024-01', 's'), ('2024-02', 's'), ('2024-03', 'f'), ('2024-04', 'f')]),
+    (['2024-01', '2024-02', '2024-03'], ['2023-12', '2024-02'], [('2024-01', 's'), ('2024-02', 's'), ('2024-03', 's')]),  # 新数据滞后
+    (['2024-01', '2024-02', '2024-03'], ['2024-01', '2024-03'], [('2024-01', 's'), ('2024-02', 's'), ('2024-03', 'f')]),
+    (['2024-01', '2024-02'], [], [('2024-01', 's'), ('2024-02', 's')]),
+    ([], ['2024-01'], [('2024-01', 'f')]),
+]
+
+def check_indicator_merge():
+    """金标校验：水位线合并不丢失本地数据（新数据截断/滞后时序列不缩短）"""
+    failures = []
+    for stored_dates, fetched_dates, expected in INDICATOR_MERGE_GOLDEN_SAMPLES:
+        stored = [{'date': d, 'value': 's'} for d in stored_dates]
+        fetched = [{'date': d, 'value': 'f'} for d in fetched_dates]
+        actual = [(r['date'], r['value']) for r in merge_indicator_series(stored, fetched)]
+        if actual != expected:
+            failures.append((stored_dates, fetched_dates, expected, actual))
+    for stored_dates, fetched_dates, expected, actual in failures:
+        print(f"   ❌ 已存 {stored_dates} + 新获取 {fetched_dates}: 期望 {expected}, 实际 {actual}")
+    print(f"{'✅' if not failures else '❌'} 指标水位线合并校验: {len(INDICATOR_MERGE_GOLDEN_SAMPLES) - len(failures)}/{len(INDICATOR_MERGE_GOLDEN_SAMPLES)} 一致")
+    return not failures
+
+def apply_indicator_store(fetched, stores, skipped=()):
+    """
+    把本次获取结果并入本地存储
+    接口失败（空列表）时沿用最近一次成功的序列；skipped 中的指标本次未请求，直接取本地存储
+    """
+    export_data = {}
+    added, fallback = {}, []
+    for key in INDICATOR_MAP:
+        series = fetched.get(key, [])
+        store = stores.get(key)
+        stored = store['series'] if store else []
+
+        if not series:
+            if stored and key not in skipped:
+                fallback.append(f"{key}(截至 {store['last_date']})")
+            export_data[key] = stored
+            continue
+
+        merged = merge_indicator_series(stored, series)
+        if not store or _series_hash(merged) != store['hash']:
+            save_indicator_store(key, merged)
+            added[key] = len(merged) - len(stored)
+        export_data[key] = merged
+
+    if added:
+        print(f"💾 本地存储已更新 {len(added)} 项: " + ", ".join(f"{k}(+{n})" for k, n in added.items()))
+    if fallback:
+        print(f"♻️ 接口失败，沿用本地存储: {', '.join(fallback)}")
+    return export_data
+
+# ==========================================
+# 7. 发布日历（未到发布窗口的指标直接用本地存储）
+# ==========================================
+# step : 相邻两期间隔（月），月度 1、季度 3
+# lag  : 序列日期所在月到下一期发布月的额外滞后（月）
+#        序列日期即发布日（金十系列、LPR、PMI）为 0；序列日期为统计期月初为 1
+# day  : 预计发布日（超过当月天数按月末计）
+# grace: 提前几天开始轮询（发布日受节假日影响会前后浮动）
+# 未列出的指标（日频行情）每次都请求
+RELEASE_SCHEDULE = {
+    'cpi': {'step': 1, 'lag': 0, 'day': 9, 'grace': 3},
+    'ppi': {'step': 1, 'lag': 0, 'day': 9, 'grace': 3},
+    'm2': {'step': 1, 'lag': 1, 'day': 10, 'grace': 4},
+    'm1': {'step': 1, 'lag': 1, 'day': 10, 'grace': 4},
+    'scissors': {'step': 1, 'lag': 1, 'day': 10, 'grace': 4},
+    'social_financing': {'step': 1, 'lag': 1, 'day': 10, 'grace': 4},
+    'lpr_1y': {'step': 1, 'lag': 0, 'day': 20, 'grace': 2},
+    'lpr_5y': {'step': 1, 'lag': 0, 'day': 20, 'grace': 2},
+    'gdp': {'step': 3, 'lag': 0, 'day': 15, 'grace': 3},
+    'pmi': {'step': 1, 'lag': 0, 'day': 31, 'grace': 2},
+    'exports_yoy': {'step': 1, 'lag': 0, 'day': 7, 'grace': 3},
+    'retail_sales': {'step': 1, 'lag': 1, 'day': 15, 'grace': 3},
+    'fx_reserves': {'step': 1, 'lag': 1, 'day': 7, 'grace': 3},
+    'resident_leverage': {'step': 3, 'lag': 2, 'day': 20, 'grace': 10},
+    'real_estate_invest': {'step': 1, 'lag': 1, 'day': 15, 'grace': 3},
+    'unemployment': {'step': 1, 'lag': 1, 'day': 15, 'grace': 3},
+}
+
+def expected_release_date(last_date, rule):
+    """根据本地最后一期日期推算下一期的预计发布日"""
+    period = pd.Timestamp(last_date).to_period('M') + rule['step'] + rule['lag']
+    day = min(rule['day'], period.days_in_month)
+    return period.to_timestamp() + pd.Timedelta(days=day - 1)
+
+def is_indicator_due(key, store, today):
+    """返回 (是否需要请求, 预计发布日)；无本地存储或不在发布日历中的指标始终需要请求"""
+    rule = RELEASE_SCHEDULE.get(key)
+    if not rule or not store:
+        return True, None
+    expected = expected_release_date(store['last_date'], rule)
+    return today >= expected - pd.Timedelta(days=rule['grace']), expected
+
+# ==========================================
+# 8. 混频月度面板
+# ==========================================
+# 所有指标按自然月对齐成一个 (月份, 指标) 的 float64 矩阵，每次运行只构建一次，
+# 供熔断校验与衍生统计共用。各频率的对齐规则：
+#   daily     : 获取时已按月末重采样，每月一条，不补值
+#   monthly   : 同月多条取最后一条；单月缺口（如 1、2 月合并发布）线性插值
+#   quarterly : 每季一条，向后填充 2 个月覆盖整个季度
+PANEL_FREQ_RULES = {
+    'daily': {'fill': None},
+    'monthly': {'fill': 'interpolate', 'limit': 1},
+    'quarterly': {'fill': 'ffill', 'limit': 2},
+}
+
+def build_equity_risk_premium(data):
+    """股权风险溢价 = 1/PE*100 - 10年国债收益率（同日对齐，与前端 processedData 口径一致）"""
+    bond_map = {r['date']: r['value'] for r in data.get('cn_bond_10y', [])}
+    return [
+        {'date': r['date'], 'value': round(100 / r['value'] - bond_map[r['date']], 2)}
+        for r in data.get('sh_index_pe', [])
+        if r['value'] > 0 and r['date'] in bond_map
+    ]
+
+def build_monthly_panel(data):
+    """
+    把 {key: 记录列表} 对齐为月度面板，返回：
+      months   : 月份序号数组（datetime64[M]，连续无缺口，行号差即月份差）
+      keys     : 列顺序
+      observed : 原始观测矩阵，无观测为 NaN（统计量只用这部分）
+      filled   : 按 PANEL_FREQ_RULES 补值后的矩阵（相关性 / 领先滞后用）
+      days     : 每个观测的原始日期（距 1970-01-01 天数，float64，无观测为 NaN）
+    频率取 INDICATOR_REGISTRY 中的 freq，未注册的衍生序列按 monthly 处理
+    """
+    keys = [k for k, v in data.items() if v]
+    lengths = [len(data[k]) for k in keys]
+    if not keys:
+        empty = np.empty((0, 0))
+        return {'months': np.array([], dtype='datetime64[M]'), 'keys': [], 'freqs': [],
+                'observed': empty, 'filled': empty, 'days': empty}
+
+    # 所有序列拼成一列统一解析，避免逐序列 to_datetime
+    dates = pd.to_datetime([r['date'] for k in keys for r in data[k]]).values
+    values = np.fromiter((r['value'] for k in keys for r in data[k]), dtype=float, count=sum(lengths))
+    cols = np.repeat(np.arange(len(keys)), lengths)
+    months = dates.astype('datetime64[M]')
+    first = months.min()
+    rows = (months - first).astype(np.int64)
+    T = int(rows.max()) + 1
+
+    # 同月多条取最后一条：按 (列, 行, 日期) 排序后保留每个 (列, 行) 的末项
+    order = np.lexsort((dates, rows, cols))
+    cell = cols[order] * T + rows[order]
+    last = order[np.r_[cell[1:] != cell[:-1], True]]
+
+    observed = np.full((T, len(keys)), np.nan)
+    days = np.full((T, len(keys)), np.nan)
+    observed[rows[last], cols[last]] = values[last]
+    days[rows[last], cols[last]] = dates[last].astype('datetime64[D]').astype(np.int64)
+
+    freq_list = [INDICATOR_REGISTRY.get(k, {}).get('freq', 'monthly') for k in keys]
+    filled = observed.copy()
+    for freq, rule in PANEL_FREQ_RULES.items():
+        idx = [i for i, f in enumerate(freq_list) if f == freq]
+        if not idx or not rule['fill']:
+            continue
+        block = pd.DataFrame(observed[:, idx])
+        if rule['fill'] == 'ffill':
+            block = block.ffill(limit=rule['limit'])
+        else:
+            block = block.interpolate(limit=rule['limit'], limit_area='inside')
+        filled[:, idx] = block.to_numpy()
+
+    return {'months': first + np.arange(T), 'keys': keys, 'freqs': freq_list,
+            'observed': observed, 'filled': filled, 'days': days}
+
+def build_run_panel(data):
+    """本次运行的面板：全部 INDICATOR_MAP 指标 + 前端用到的股权风险溢价"""
+    series_map = {k: data.get(k) or [] for k in INDICATOR_MAP}
+    series_map['equity_risk_premium'] = build_equity_risk_premium(series_map)
+    return build_monthly_panel(series_map)
+
+# ==========================================
+# 9. 衍生统计（Z-Score / 百分位 / 相关性 / 领先滞后）
+# ==========================================
+# 与前端时间范围选项一致，每个范围预先算好一份
+DERIVED_RANGES = {'5Y': 5, '10Y': 10, '20Y': 20, 'ALL': None}
+DERIVED_MIN_POINTS = 12   # 与前端一致：少于 12 个点的指标不出统计
+LEAD_LAG_MAX = 12         # 预设指标对输出 0~12 个月的相关系数曲线
+LEAD_LAG_WINDOW = 24      # 全指标对扫描 ±24 个月
+LEAD_LAG_MIN_OVERLAP = 24 # 扫描时重叠不足 24 个月的滞后期不参与选最优
+
+# 与 LeadLagChart 的 LEAD_LAG_PAIRS 对应：id -> (领先指标, 滞后指标, 领先指标是否反向)
+LEAD_LAG_PAIRS = {
+    'credit_to_growth': ('social_financing', 'gdp', False),
+    'm1_to_stock': ('m1', 'sh_index_pe', False),
+    'pmi_to_ppi': ('pmi', 'ppi', False),
+    'rate_to_realestate': ('lpr_5y', 'real_estate_invest', True),
+    'scissors_to_stock': ('scissors', 'sh_index', False),
+}
+
+def pairwise_corr(x, y, min_periods=3):
+    """
+    成对完整观测的皮尔逊相关系数：x (T, A)、y (T, B) -> (A, B)
+    NaN 视为缺失，每一对只用两者都有值的月份；样本不足或方差为 0 时记 0（与前端一致）
+    """
+    mx, my = ~np.isnan(x), ~np.isnan(y)
+    fx, fy = mx.astype(float), my.astype(float)
+    # 先按列去均值，降低 sum-of-squares 相减时的精度损失；缺失位置置 0 后不参与求和
+    x0 = np.where(mx, x - np.where(mx, x, 0).sum(axis=0) / np.maximum(fx.sum(axis=0), 1), 0.0)
+    y0 = np.where(my, y - np.where(my, y, 0).sum(axis=0) / np.maximum(fy.sum(axis=0), 1), 0.0)
+    n = fx.T @ fy
+    sx, sy = x0.T @ fy, fx.T @ y0
+    sxx, syy = (x0 ** 2).T @ fy, fx.T @ (y0 ** 2)
+    sxy = x0.T @ y0
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cov = sxy - sx * sy / n
+        var_x = sxx - sx ** 2 / n
+        var_y = syy - sy ** 2 / n
+        corr = cov / np.sqrt(var_x * var_y)
+    corr[(n < min_periods) | ~np.isfinite(corr)] = 0.0
+    return np.clip(corr, -1.0, 1.0)
+
+def summarize_columns(values):
+    """对 (T, K) 矩阵逐列向量化计算最新值、Z-Score（总体标准差）、百分位、中位数等"""
+    mask = ~np.isnan(values)
+    n = mask.sum(axis=0)
+    rows = np.arange(values.shape[0])[:, None]
+    last_idx = np.where(mask, rows, -1).max(axis=0)
+    prev_idx = np.where(mask & (rows < last_idx), rows, -1).max(axis=0)
+    cols = np.arange(values.shape[1])
+    current = values[np.maximum(last_idx, 0), cols]
+    prev = np.where(prev_idx >= 0, values[np.maximum(prev_idx, 0), cols], current)
+
+    with np.errstate(invalid='ignore', divide='ignore'), warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)  # 全 NaN 列（该范围内无数据）
+        mean = np.nanmean(values, axis=0)
+        std = np.nanstd(values, axis=0)
+        z = np.where(std > 0, (current - mean) / std, 0.0)
+        # 百分位：严格小于当前值的样本占比（与前端 calculatePercentile 一致）
+        percentile = (values < current).sum(axis=0) / n * 100
+    # 中位数取排序后第 floor(n/2) 个（NaN 排在末尾）
+    ordered = np.sort(values, axis=0)
+    median = ordered[np.minimum(n // 2, values.shape[0] - 1), cols]
+    return {
+        'n': n, 'value': current, 'prev': prev, 'mean': mean, 'std': std, 'z': z,
+        'percentile': percentile, 'min': np.where(mask, values, np.inf).min(axis=0),
+        'max': np.where(mask, values, -np.inf).max(axis=0), 'median': median,
+    }
+
+def cross_lag_corr(x, max_lag=LEAD_LAG_WINDOW, min_periods=3):
+    """
+    全部指标对、全部滞后期的互相关，FFT 一次算完：x (T, K) -> (lags, corr (K, K, L), n (K, K, L))
+    corr[i, j, max_lag + k] = corr(x_i[t-k], x_j[t])，即 k > 0 时 i 领先 j k 个月
+    与 pairwise_corr 口径相同（成对完整观测），各项求和都是两个序列的互相关，
+    补零到 >= 2T 后用 rfft 计算避免循环卷绕
+    """
+    T, K = x.shape
+    lags = np.arange(-max_lag, max_lag + 1)
+    mask = ~np.isnan(x)
+    fm = mask.astype(float)
+    x0 = np.where(mask, x - np.where(mask, x, 0).sum(axis=0) / np.maximum(fm.sum(axis=0), 1), 0.0)
+
+    nfft = 1 << int(np.ceil(np.log2(max(2 * T, 2))))
+    spec_m, spec_x, spec_xx = (np.fft.rfft(a, n=nfft, axis=0) for a in (fm, x0, x0 ** 2))
+
+    def xcorr(a, b):
+        # sum_t a_i[t-k] * b_j[t] = irfft(conj(A_i) * B_j)[k]
+        full = np.fft.irfft(np.conj(a)[:, :, None] * b[:, None, :], n=nfft, axis=0)
+        return np.moveaxis(full[lags % nfft], 0, -1)
+
+    n = np.rint(xcorr(spec_m, spec_m))
+    sx, sy = xcorr(spec_x, spec_m), xcorr(spec_m, spec_x)
+    sxx, syy = xcorr(spec_xx, spec_m), xcorr(spec_m, spec_xx)
+    sxy = xcorr(spec_x, spec_x)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cov = sxy - sx * sy / n
+        var_x = sxx - sx ** 2 / n
+        var_y = syy - sy ** 2 / n
+        corr = cov / np.sqrt(var_x * var_y)
+    # 浮点误差可能让零方差算成极小正数，按样本数 + 方差下限一并剔除
+    corr[(n < min_periods) | ~np.isfinite(corr) | (var_x <= 1e-9 * sxx) | (var_y <= 1e-9 * syy)] = 0.0
+    return lags, np.clip(corr, -1.0, 1.0), n
+
+def scan_lead_lag(keys, corr, n, lags, min_overlap=LEAD_LAG_MIN_OVERLAP):
+    """
+    对每个指标对取 |相关系数| 最大的滞后期，按强度降序返回 [领先指标序号, 滞后指标序号, 领先月数, 相关系数]
+    重叠样本不足 min_overlap 个月的滞后期不参与比较
+    """
+    K = len(keys)
+    strength = np.where(n >= min_overlap, np.abs(corr), -1.0)
+    best = strength.argmax(axis=2)
+    i, j = np.triu_indices(K, k=1)
+    best_idx = best[i, j]
+    best_lag = lags[best_idx]
+    best_corr = corr[i, j, best_idx]
+    valid = strength[i, j, best_idx] > 0
+    # 负滞后即 j 领先 i：翻转方向，统一成“领先指标在前、领先月数 >= 0”
+    lead = np.where(best_lag >= 0, i, j)
+    follow = np.where(best_lag >= 0, j, i)
+    order = np.argsort(-np.abs(best_corr[valid]), kind='stable')
+    return [
+        [int(a), int(b), int(abs(k)), round(float(c), 3)]
+        for a, b, k, c in zip(lead[valid][order], follow[valid][order], best_lag[valid][order], best_corr[valid][order])
+    ]
+
+def benchmark_lead_lag(months=420, indicators=26, repeat=3):
+    """微基准：逐指标对、逐滞后期循环 vs FFT 全量互相关（合成数据，含缺失）"""
+    rng = np.random.default_rng(0)
+    x = rng.normal(size=(months, indicators)).cumsum(axis=0)
+    x[rng.random(x.shape) < 0.1] = np.nan
+    x[:rng.integers(0, months // 2), ::3] = np.nan   # 部分指标起始较晚
+    K, W = indicators, LEAD_LAG_WINDOW
+
+    def naive():
+        out = np.zeros((K, K, 2 * W + 1))
+        for i in range(K):
+            for j in range(K):
+                for k in range(-W, W + 1):
+                    a = np.full(months, np.nan)
+                    if k >= 0:
+                        a[k:] = x[:months - k, i]
+                    else:
+                        a[:k] = x[-k:, i]
+                    out[i, j, k + W] = pairwise_corr(a[:, None], x[:, j:j + 1])[0, 0]
+        return out
+
+    pairs = K * (K - 1) // 2
+    print(f"📏 领先滞后扫描基准 ({months} 个月 × {K} 个指标 = {pairs} 对, 滞后 ±{W})")
+    t_naive = _timeit(naive)
+    t_fft = min(_timeit(lambda: cross_lag_corr(x)) for _ in range(repeat))
+    diff = np.abs(naive() - cross_lag_corr(x)[1]).max()
+    print(f"   逐对循环 {t_naive * 1000:8.1f}ms | FFT {t_fft * 1000:6.1f}ms | 加速 {t_naive / t_fft:6.1f}x | 最大误差 {diff:.1e}")
+
+def compute_derived_stats(panel, today=None):
+    """
+    基于月度面板预计算前端各分析组件所需统计量，输出 derived 段：
+    ranges[范围] = {stats: {指标: {...}}, correlation: {keys, matrix}, lead_lag: {pair_id: {...}}}
+    """
+    t0 = time.perf_counter()
+    today = pd.Timestamp(today or pd.Timestamp.now()).normalize()
+    keys = panel['keys']
+
+    def r3(arr):
+        return [round(float(v), 3) for v in arr]
+
+    ranges = {}
+    for name, years in DERIVED_RANGES.items():
+        observed, filled = panel['observed'], panel['filled']
+        if years:
+            cutoff = today - pd.DateOffset(years=years)
+            # 统计量与前端 filterData 的 date >= cutoff 口径一致：按观测原始日期截取
+            cutoff_day = (cutoff.to_datetime64().astype('datetime64[D]')).astype(np.int64)
+            observed = np.where(panel['days'] >= cutoff_day, observed, np.nan)
+            filled = filled[panel['months'] >= cutoff.to_datetime64().astype('datetime64[M]')]
+        if observed.size == 0:
+            ranges[name] = {'stats': {}, 'correlation': {'keys': [], 'matrix': []}, 'lead_lag': {},
+                            'lead_lag_scan': {'keys': [], 'max_lag': LEAD_LAG_WINDOW, 'pairs': []}}
+            continue
+
+        summary = summarize_columns(observed)
+        stats = {}
+        for i, key in enumerate(keys):
+            if summary['n'][i] < DERIVED_MIN_POINTS:
+                continue
+            stats[key] = {f: (int(summary[f][i]) if f == 'n' else round(float(summary[f][i]), 4)) for f in summary}
+
+        # 一次 FFT 得到全部指标对 ±LEAD_LAG_WINDOW 的互相关，滞后 0 即同期相关矩阵
+        lags, lag_corr, lag_n = cross_lag_corr(filled)
+        zero = LEAD_LAG_WINDOW
+        corr = lag_corr[:, :, zero]
+        lead_lag = {}
+        for pair_id, (lead_key, lag_key, invert) in LEAD_LAG_PAIRS.items():
+            if lead_key not in keys or lag_key not in keys:
+                continue
+            profile = lag_corr[keys.index(lead_key), keys.index(lag_key), zero:zero + LEAD_LAG_MAX + 1]
+            if invert:
+                profile = -profile
+            best = int(np.argmax(np.abs(profile)))
+            lead_lag[pair_id] = {'corr': r3(profile), 'best_lag': best, 'best_corr': round(float(profile[best]), 3)}
+
+        ranges[name] = {
+            'stats': stats,
+            'correlation': {'keys': keys, 'matrix': [r3(row) for row in corr]},
+            'lead_lag': lead_lag,
+            'lead_lag_scan': {'keys': keys, 'max_lag': LEAD_LAG_WINDOW,
+                              'pairs': scan_lead_lag(keys, lag_corr, lag_n, lags)},
+        }
+
+    print(f"📐 衍生统计完成: {len(keys)} 个指标 × {len(ranges)} 个时间范围 ({(time.perf_counter() - t0) * 1000:.0f}ms)")
+    return {'as_of': today.strftime('%Y-%m-%d'), 'ranges': ranges}
+
+# ==========================================
+# 10. 校验与生成
 # ==========================================
-def validate_and_generate(data, filename="macro_data.ts"):
+def encode_compact_series(series):
+    """
+    列式压缩单个序列：{d: 日期, v: 数值}
+    d 首项为距 1970-01-01 的天数，其后每项为与上一项的天数差（月度序列多为 28~31 的小整数）
+    """
+    if not series:
+        return {'d': [], 'v': []}
+    days = pd.to_datetime([r['date'] for r in series]).values.astype('datetime64[D]').astype(np.int64)
+    deltas = np.diff(days, prepend=0)
+    return {'d': deltas.tolist(), 'v': [r['value'] for r in series]}
+
+def validate_and_generate(data, filename="macro_data.ts", output_format=OUTPUT_FORMAT, derived=None, panel=None):
     print("\n" + "="*60)
     print("🚦 熔断校验...")
     missing_data = []
     
+    # 以月度面板中的有效观测数为准（未传入时现场构建）
+    panel = panel or build_run_panel(data)
+    observed_counts = dict(zip(panel['keys'], (~np.isnan(panel['observed'])).sum(axis=0)))
     for key in CRITICAL_KEYS:
-        if key not in data or not data[key]:
+        if not observed_counts.get(key):
             missing_data.append(key)
     
     if len(missing_data) > 0:
@@ -467,14 +1058,20 @@ def validate_and_generate(data, filename="macro_data.ts"):
     script_dir = os.path.dirname(os.path.abspath(__file__))
     file_path = os.path.join(script_dir, filename)
     
-    # 构造最终输出对象： labels + data
+    # 构造最终输出对象： labels + data (+ derived)
     final_output = {
         "labels": INDICATOR_MAP,
         "data": data,
         "meta": data.pop("meta") # 移动 meta
     }
+    if derived:
+        final_output["derived"] = derived
     
-    json_str = json.dumps(final_output, indent=2, ensure_ascii=False)
+    if output_format == 'compact':
+        compact_output = {**final_output, "data": {k: encode_compact_series(v) for k, v in data.items()}}
+        json_str = json.dumps(compact_output, ensure_ascii=False, separators=(',', ':'))
+    else:
+        json_str = json.dumps(final_output, indent=2, ensure_ascii=False)
     
     # TS 结构定义也随之更新
     ts_content = f"""// Auto-generated (v23.0 Optimized)
@@ -523,9 +1120,79 @@ export interface MacroDataResponse {{
     source: string;
     updated_at: string;
   }};
+  derived?: DerivedStats;
+}}
+
+// 后端预计算的统计量（按时间范围）
+export interface DerivedMetricStats {{
+  n: number;
+  value: number;
+  prev: number;
+  mean: number;
+  std: number;
+  z: number;
+  percentile: number;
+  min: number;
+  max: number;
+  median: number;
+}}
+
+export interface DerivedLeadLag {{
+  corr: number[]; // 下标即领先月数
+  best_lag: number;
+  best_corr: number;
+}}
+
+export interface DerivedRangeStats {{
+  stats: {{ [key: string]: DerivedMetricStats }};
+  correlation: {{ keys: string[]; matrix: number[][] }};
+  lead_lag: {{ [pairId: string]: DerivedLeadLag }};
+  // 全指标对扫描：pairs 每项为 [领先指标序号, 滞后指标序号, 领先月数, 相关系数]，按 |相关系数| 降序
+  lead_lag_scan: {{ keys: string[]; max_lag: number; pairs: [number, number, number, number][] }};
+}}
+
+export interface DerivedStats {{
+  as_of: string;
+  ranges: {{ [range: string]: DerivedRangeStats }};
+}}
+
+"""
+    if output_format == 'compact':
+        ts_content += f"""// 紧凑列式格式：d 为日期（首项距 1970-01-01 天数，其后为天数差），v 为数值
+interface CompactSeries {{
+  d: number[];
+  v: number[];
 }}
 
-export const MACRO_DATA: MacroDataResponse = {json_str};
+const COMPACT_DATA: {{
+  labels: {{ [key: string]: string }};
+  data: {{ [key: string]: CompactSeries }};
+  meta: MacroDataResponse['meta'];
+  derived?: DerivedStats;
+}} = {json_str};
+
+const DAY_MS = 86400000;
+
+// 兼容适配：还原为 MacroDataPoint[]，组件无需改动
+const expandSeries = (series: CompactSeries): MacroDataPoint[] => {{
+  let day = 0;
+  return series.d.map((delta, i) => {{
+    day += delta;
+    return {{ date: new Date(day * DAY_MS).toISOString().slice(0, 10), value: series.v[i] }};
+  }});
+}};
+
+export const MACRO_DATA: MacroDataResponse = {{
+  labels: COMPACT_DATA.labels,
+  data: Object.fromEntries(
+    Object.entries(COMPACT_DATA.data).map(([key, series]) => [key, expandSeries(series)])
+  ) as MacroDataResponse['data'],
+  meta: COMPACT_DATA.meta,
+  derived: COMPACT_DATA.derived,
+}};
+"""
+    else:
+        ts_content += f"""export const MACRO_DATA: MacroDataResponse = {json_str};
 """
     with open(file_path, "w", encoding="utf-8") as f:
         f.write(ts_content)
@@ -533,5 +1200,24 @@ export const MACRO_DATA: MacroDataResponse = {json_str};
 
 if __name__ == "__main__":
     sys.setrecursionlimit(5000)
-    data = fetch_macro_data_v23()
-    validate_and_generate(data)
\ No newline at end of file
+    if '--selfcheck' in sys.argv:
+        ok = check_date_normalizer()
+        ok = check_numeric_cleaner() and ok
+        ok = check_indicator_merge() and ok
+        sys.exit(0 if ok else 1)
+    if '--bench' in sys.argv:
+        benchmark_clean_value()
+        benchmark_lead_lag()
+        sys.exit(0)
+    workers = FETCH_WORKERS
+    for arg in sys.argv[1:]:
+        if arg.startswith('--workers='):
+            workers = max(1, int(arg.split('=', 1)[1]))
+    output_format = OUTPUT_FORMAT
+    for arg in sys.argv[1:]:
+        if arg.startswith('--format='):
+            output_format = arg.split('=', 1)[1]
+    data = fetch_macro_data_v23(workers=workers, force='--force' in sys.argv)
+    panel = build_run_panel(data)
+    derived = compute_derived_stats(panel)
+    validate_and_generate(data, output_format=output_format, derived=derived, panel=panel)
\ No newline at end of file
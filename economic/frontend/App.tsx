@@ -32,7 +32,7 @@ import {
   PieChart,
   Layers
 } from 'lucide-react';
-import { MacroDataPoint } from './types';
+import { MacroDataPoint, MacroDataResponse } from './types';
 
 type TimeRange = '5Y' | '10Y' | '20Y' | 'ALL';
 type DashboardMode = 'data_analysis' | 'observation' | 'investment' | 'credit' | 'real_estate' | 'external';
@@ -88,6 +88,9 @@ const App: React.FC = () => {
 
   const filteredData = useMemo(() => filterData(timeRange, processedData), [timeRange, processedData]);
 
+  // 后端预计算的统计量（Z-Score / 百分位 / 相关性 / 领先滞后），旧数据文件中没有时组件自行计算
+  const derivedStats = (MACRO_DATA as MacroDataResponse).derived?.ranges[timeRange];
+
   // --- Metric Selection per Mode ---
   const investmentMetricKeys = [
     'equity_risk_premium', 'sh_index_pe', 'cn_bond_10y', 'bond_spread',
@@ -299,10 +302,12 @@ const App: React.FC = () => {
               data={filteredData}
               metricKeys={allMetricKeys}
               theme={theme}
+              derived={derivedStats}
             />
             <LeadLagChart 
               data={filteredData}
               theme={theme}
+              derived={derivedStats}
             />
           </div>
 
@@ -317,6 +322,7 @@ const App: React.FC = () => {
               metricKeys={allMetricKeys}
               theme={theme}
               timeRange={timeRange}
+              derived={derivedStats}
             />
           </div>
 
@@ -331,6 +337,7 @@ const App: React.FC = () => {
               metricKeys={allMetricKeys}
               theme={theme}
               minCorrelation={0.6}
+              derived={derivedStats}
             />
           </div>
 
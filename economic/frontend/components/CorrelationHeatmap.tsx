@@ -1,5 +1,5 @@
 import React, { useMemo, useState } from 'react';
-import { MacroDataPoint } from '../types';
+import { MacroDataPoint, DerivedRangeStats } from '../types';
 import { METRIC_DEFINITIONS } from '../constants';
 import { X, TrendingUp, TrendingDown, Minus, Grid3X3, Info, ChevronDown, ChevronUp, Filter } from 'lucide-react';
 import {
@@ -18,6 +18,7 @@ interface CorrelationHeatmapProps {
   metricKeys: string[];
   theme: string;
   minCorrelation?: number; // 最小相关性阈值，默认0.6（中等偏强相关）
+  derived?: DerivedRangeStats; // 后端预计算的相关系数矩阵，缺失时回退到前端计算
 }
 
 // 计算皮尔逊相关系数
@@ -257,7 +258,8 @@ export const CorrelationHeatmap: React.FC<CorrelationHeatmapProps> = ({
   data,
   metricKeys,
   theme,
-  minCorrelation = 0.6
+  minCorrelation = 0.6,
+  derived
 }) => {
   const [isExpanded, setIsExpanded] = useState(false);
   const [showAllCorrelations, setShowAllCorrelations] = useState(false);
@@ -276,13 +278,21 @@ export const CorrelationHeatmap: React.FC<CorrelationHeatmapProps> = ({
   // 计算所有指标对的相关性
   const allCorrelationPairs = useMemo(() => {
     const pairs: { key1: string; key2: string; corr: number }[] = [];
+    const index = derived && new Map(derived.correlation.keys.map((k, i) => [k, i]));
 
     for (let i = 0; i < metricKeys.length; i++) {
       for (let j = i + 1; j < metricKeys.length; j++) {
-        const data1 = data[metricKeys[i]] || [];
-        const data2 = data[metricKeys[j]] || [];
-        const { values1, values2 } = alignTimeSeries(data1, data2);
-        const corr = calculateCorrelation(values1, values2);
+        let corr = 0;
+        if (index) {
+          const a = index.get(metricKeys[i]);
+          const b = index.get(metricKeys[j]);
+          if (a !== undefined && b !== undefined) corr = derived!.correlation.matrix[a][b];
+        } else {
+          const data1 = data[metricKeys[i]] || [];
+          const data2 = data[metricKeys[j]] || [];
+          const { values1, values2 } = alignTimeSeries(data1, data2);
+          corr = calculateCorrelation(values1, values2);
+        }
         pairs.push({ key1: metricKeys[i], key2: metricKeys[j], corr });
       }
     }
@@ -290,7 +300,7 @@ export const CorrelationHeatmap: React.FC<CorrelationHeatmapProps> = ({
     // 按相关性绝对值排序
     pairs.sort((a, b) => Math.abs(b.corr) - Math.abs(a.corr));
     return pairs;
-  }, [data, metricKeys]);
+  }, [data, metricKeys, derived]);
 
   // 根据阈值过滤
   const filteredPairs = useMemo(() => {
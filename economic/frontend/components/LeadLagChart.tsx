@@ -10,7 +10,7 @@ import {
   Legend,
   ReferenceLine
 } from 'recharts';
-import { MacroDataPoint } from '../types';
+import { MacroDataPoint, DerivedRangeStats } from '../types';
 import { METRIC_DEFINITIONS } from '../constants';
 import { 
   GitBranch, 
@@ -25,6 +25,7 @@ import {
 interface LeadLagChartProps {
   data: { [key: string]: MacroDataPoint[] };
   theme: string;
+  derived?: DerivedRangeStats; // 后端预计算的领先滞后相关系数，缺失时回退到前端计算
 }
 
 // 领先-滞后关系定义
@@ -142,7 +143,7 @@ const CustomTooltip = ({ active, payload, label }: any) => {
   return null;
 };
 
-export const LeadLagChart: React.FC<LeadLagChartProps> = ({ data, theme }) => {
+export const LeadLagChart: React.FC<LeadLagChartProps> = ({ data, theme, derived }) => {
   const [isExpanded, setIsExpanded] = useState(true);
   const [selectedPair, setSelectedPair] = useState(LEAD_LAG_PAIRS[0].id);
 
@@ -196,20 +197,24 @@ export const LeadLagChart: React.FC<LeadLagChartProps> = ({ data, theme }) => {
       return point;
     });
 
-    // 计算领先相关性（将领先指标前移后与滞后指标对比）
-    const shiftedLead: number[] = [];
-    const alignedLag: number[] = [];
-    
-    for (let i = currentPair.leadMonths; i < result.length; i++) {
-      const leadPoint = result[i - currentPair.leadMonths];
-      const lagPoint = result[i];
-      if (leadPoint?.lead !== undefined && lagPoint?.lag !== undefined) {
-        shiftedLead.push(currentPair.invertLead ? -leadPoint.lead : leadPoint.lead);
-        alignedLag.push(lagPoint.lag);
+    // 计算领先相关性（将领先指标前移后与滞后指标对比），优先取后端按月对齐的结果
+    const pre = derived?.lead_lag[currentPair.id]?.corr[currentPair.leadMonths];
+    let correlation = pre ?? 0;
+    if (pre === undefined) {
+      const shiftedLead: number[] = [];
+      const alignedLag: number[] = [];
+
+      for (let i = currentPair.leadMonths; i < result.length; i++) {
+        const leadPoint = result[i - currentPair.leadMonths];
+        const lagPoint = result[i];
+        if (leadPoint?.lead !== undefined && lagPoint?.lag !== undefined) {
+          shiftedLead.push(currentPair.invertLead ? -leadPoint.lead : leadPoint.lead);
+          alignedLag.push(lagPoint.lag);
+        }
       }
+
+      correlation = calculateCorrelation(shiftedLead, alignedLag);
     }
-    
-    const correlation = calculateCorrelation(shiftedLead, alignedLag);
 
     // 预测：用最近的领先指标值预测未来
     const recentLead = result.filter(d => d.lead !== undefined).slice(-3);
@@ -225,11 +230,26 @@ export const LeadLagChart: React.FC<LeadLagChartProps> = ({ data, theme }) => {
     }
 
     return { data: result, correlation, prediction };
-  }, [data, currentPair]);
+  }, [data, currentPair, derived]);
 
   const leadConfig = METRIC_DEFINITIONS[currentPair.leadKey];
   const lagConfig = METRIC_DEFINITIONS[currentPair.lagKey];
 
+  // 后端全指标对扫描出的最强领先关系（剔除同期相关）
+  const scannedPairs = useMemo(() => {
+    const scan = derived?.lead_lag_scan;
+    if (!scan) return [];
+    return scan.pairs
+      .filter(([, , months]) => months > 0)
+      .slice(0, 5)
+      .map(([lead, lag, months, corr]) => ({
+        leadKey: scan.keys[lead],
+        lagKey: scan.keys[lag],
+        months,
+        corr
+      }));
+  }, [derived]);
+
   return (
     <div className="bg-gray-900/50 border border-gray-800 rounded-lg overflow-hidden">
       {/* Header */}
@@ -257,7 +277,7 @@ export const LeadLagChart: React.FC<LeadLagChartProps> = ({ data, theme }) => {
       </button>
 
       {/* Content */}
-      <div className={`overflow-hidden transition-all duration-300 ${isExpanded ? 'max-h-[600px]' : 'max-h-0'}`}>
+      <div className={`overflow-hidden transition-all duration-300 ${isExpanded ? 'max-h-[800px]' : 'max-h-0'}`}>
         <div className="px-4 pb-4">
           {/* Pair Selector */}
           <div className="flex flex-wrap gap-2 mb-4">
@@ -396,6 +416,30 @@ export const LeadLagChart: React.FC<LeadLagChartProps> = ({ data, theme }) => {
             <Info className="w-3 h-3 mt-0.5 flex-shrink-0" />
             <span>{currentPair.description}。数据已标准化到 0-100 区间便于对比。</span>
           </div>
+
+          {/* Scanned Pairs */}
+          {scannedPairs.length > 0 && (
+            <div className="mt-3 pt-3 border-t border-gray-700/50">
+              <div className="text-xs text-gray-400 mb-2">
+                全指标扫描：最强领先关系（±{derived!.lead_lag_scan.max_lag} 个月）
+              </div>
+              <div className="space-y-1">
+                {scannedPairs.map(p => (
+                  <div key={`${p.leadKey}-${p.lagKey}`} className="flex items-center justify-between text-xs">
+                    <div className="flex items-center gap-1.5 text-gray-300">
+                      <span>{METRIC_DEFINITIONS[p.leadKey]?.label || p.leadKey}</span>
+                      <ArrowRight className="w-3 h-3 text-gray-500" />
+                      <span>{METRIC_DEFINITIONS[p.lagKey]?.label || p.lagKey}</span>
+                      <span className="text-gray-500">领先 {p.months} 个月</span>
+                    </div>
+                    <span className={`font-mono ${p.corr > 0 ? 'text-emerald-400' : 'text-rose-400'}`}>
+                      {(p.corr * 100).toFixed(0)}%
+                    </span>
+                  </div>
+                ))}
+              </div>
+            </div>
+          )}
         </div>
       </div>
     </div>
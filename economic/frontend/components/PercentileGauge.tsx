@@ -1,5 +1,5 @@
 import React, { useMemo, useState } from 'react';
-import { MacroDataPoint } from '../types';
+import { MacroDataPoint, DerivedRangeStats } from '../types';
 import { METRIC_DEFINITIONS } from '../constants';
 import { 
   Gauge, 
@@ -16,6 +16,7 @@ interface PercentileGaugeProps {
   metricKeys: string[];
   theme: string;
   timeRange: '5Y' | '10Y' | '20Y' | 'ALL';
+  derived?: DerivedRangeStats; // 后端预计算结果，缺失时回退到前端计算
 }
 
 interface MetricPercentile {
@@ -104,7 +105,8 @@ export const PercentileGauge: React.FC<PercentileGaugeProps> = ({
   data, 
   metricKeys, 
   theme,
-  timeRange 
+  timeRange,
+  derived
 }) => {
   const [isExpanded, setIsExpanded] = useState(true);
   const [sortBy, setSortBy] = useState<'name' | 'percentile'>('percentile');
@@ -114,23 +116,31 @@ export const PercentileGauge: React.FC<PercentileGaugeProps> = ({
     const results: MetricPercentile[] = [];
     
     metricKeys.forEach(key => {
-      const series = data[key];
-      if (!series || series.length < 12) return;
-      
       const config = METRIC_DEFINITIONS[key];
       if (!config) return;
-      
-      const values = series.map(d => d.value);
-      const sortedValues = [...values].sort((a, b) => a - b);
-      
-      const currentValue = series[series.length - 1].value;
-      const prevValue = series[series.length - 2]?.value || currentValue;
-      const change = currentValue - prevValue;
-      
-      const percentile = calculatePercentile(currentValue, sortedValues);
-      const min = sortedValues[0];
-      const max = sortedValues[sortedValues.length - 1];
-      const median = sortedValues[Math.floor(sortedValues.length / 2)];
+
+      let currentValue: number, change: number, percentile: number;
+      let min: number, max: number, median: number;
+      const pre = derived?.stats[key];
+      if (pre) {
+        ({ value: currentValue, percentile, min, max, median } = pre);
+        change = currentValue - pre.prev;
+      } else {
+        const series = data[key];
+        if (derived || !series || series.length < 12) return;
+
+        const values = series.map(d => d.value);
+        const sortedValues = [...values].sort((a, b) => a - b);
+
+        currentValue = series[series.length - 1].value;
+        const prevValue = series[series.length - 2]?.value || currentValue;
+        change = currentValue - prevValue;
+
+        percentile = calculatePercentile(currentValue, sortedValues);
+        min = sortedValues[0];
+        max = sortedValues[sortedValues.length - 1];
+        median = sortedValues[Math.floor(sortedValues.length / 2)];
+      }
       
       const trend = change > 0.01 ? 'up' : change < -0.01 ? 'down' : 'flat';
       
@@ -158,7 +168,7 @@ export const PercentileGauge: React.FC<PercentileGaugeProps> = ({
     }
     
     return results;
-  }, [data, metricKeys, sortBy]);
+  }, [data, metricKeys, sortBy, derived]);
 
   // 统计极端值数量
   const extremeCount = percentiles.filter(p => p.percentile < 10 || p.percentile > 90).length;
@@ -10,7 +10,7 @@ import {
   ReferenceLine,
   Cell
 } from 'recharts';
-import { MacroDataPoint } from '../types';
+import { MacroDataPoint, DerivedRangeStats } from '../types';
 import { METRIC_DEFINITIONS } from '../constants';
 import { 
   BarChart3, 
@@ -24,6 +24,7 @@ interface ZScoreChartProps {
   data: { [key: string]: MacroDataPoint[] };
   metricKeys: string[];
   theme: string;
+  derived?: DerivedRangeStats; // 后端预计算结果，缺失时回退到前端计算
 }
 
 interface ZScoreItem {
@@ -121,7 +122,7 @@ const CustomTooltip = ({ active, payload }: any) => {
   return null;
 };
 
-export const ZScoreChart: React.FC<ZScoreChartProps> = ({ data, metricKeys, theme }) => {
+export const ZScoreChart: React.FC<ZScoreChartProps> = ({ data, metricKeys, theme, derived }) => {
   const [isExpanded, setIsExpanded] = useState(true);
   const [sortBy, setSortBy] = useState<'name' | 'zscore'>('zscore');
 
@@ -130,16 +131,21 @@ export const ZScoreChart: React.FC<ZScoreChartProps> = ({ data, metricKeys, them
     const results: ZScoreItem[] = [];
     
     metricKeys.forEach(key => {
-      const series = data[key];
-      if (!series || series.length < 12) return;
-      
       const config = METRIC_DEFINITIONS[key];
       if (!config) return;
-      
-      const values = series.map(d => d.value);
-      const currentValue = values[values.length - 1];
-      
-      const { zScore, mean, std } = calculateZScore(currentValue, values);
+
+      let currentValue: number, zScore: number, mean: number, std: number;
+      const pre = derived?.stats[key];
+      if (pre) {
+        ({ value: currentValue, z: zScore, mean, std } = pre);
+      } else {
+        const series = data[key];
+        if (derived || !series || series.length < 12) return;
+
+        const values = series.map(d => d.value);
+        currentValue = values[values.length - 1];
+        ({ zScore, mean, std } = calculateZScore(currentValue, values));
+      }
       
       results.push({
         key,
@@ -161,7 +167,7 @@ export const ZScoreChart: React.FC<ZScoreChartProps> = ({ data, metricKeys, them
     }
     
     return results;
-  }, [data, metricKeys, sortBy]);
+  }, [data, metricKeys, sortBy, derived]);
 
   // 统计
   const extremeCount = zScoreData.filter(d => d.isExtreme).length;
@@ -33,6 +33,40 @@ export interface MacroDataResponse {
     [key: string]: MacroDataPoint[]; // Index signature for dynamic access
   };
   meta: { source: string; updated_at: string };
+  derived?: DerivedStats;
+}
+
+// 后端（fetch_data.py）按时间范围预计算的统计量，组件优先使用，缺失时回退到前端计算
+export interface DerivedMetricStats {
+  n: number;
+  value: number;
+  prev: number;
+  mean: number;
+  std: number;
+  z: number;
+  percentile: number;
+  min: number;
+  max: number;
+  median: number;
+}
+
+export interface DerivedLeadLag {
+  corr: number[]; // 下标即领先月数
+  best_lag: number;
+  best_corr: number;
+}
+
+export interface DerivedRangeStats {
+  stats: { [key: string]: DerivedMetricStats };
+  correlation: { keys: string[]; matrix: number[][] };
+  lead_lag: { [pairId: string]: DerivedLeadLag };
+  // 全指标对扫描：pairs 每项为 [领先指标序号, 滞后指标序号, 领先月数, 相关系数]，按 |相关系数| 降序
+  lead_lag_scan: { keys: string[]; max_lag: number; pairs: [number, number, number, number][] };
+}
+
+export interface DerivedStats {
+  as_of: string;
+  ranges: { [range: string]: DerivedRangeStats };
 }
 
 // Configuration for charts and cards
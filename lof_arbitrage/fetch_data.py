@@ -4,18 +4,34 @@
 LOF基金套利监测数据获取脚本
 核心改进：使用【盘中实时估值】vs【场内价格】计算真实套利折溢价
 而非 T-1 净值 vs 场内价格（会产生假信号）
+
+用法:
+  python fetch_data.py                        # 执行一次更新
+  python fetch_data.py --daemon [--interval=60]  # 常驻监测，交易时段内按间隔（秒）刷新
+  python fetch_data.py [--daemon] --delta     # 增量输出：lof_data.ts 为快照，每轮只写 lof_patch.ts
+  python fetch_data.py --refresh-status       # 执行一次更新，并强制刷新申购状态缓存
+  python fetch_data.py --profile              # 执行一次更新，并统计各阶段内存分配峰值
+  python fetch_data.py --bench                # 基金分类微基准
+  python fetch_data.py --selfcheck            # 金标校验（指数推算IOPV的交易日判断）
+  python fetch_data.py --backtest             # 用历史面板回测溢价套利信号（阈值/成交额参数网格）
 """
 
+import bisect
 import json
 import os
+import random
+import re
 import sys
+import threading
 import time
-from datetime import datetime, date
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from functools import lru_cache
+from datetime import datetime, date, timedelta
 import warnings
 import ssl
 import urllib3
 import requests
-import hashlib
 
 # ==========================================
 # 🛡️ 系统底层配置
@@ -39,20 +55,37 @@ def new_session_request(self, method, url, *args, **kwargs):
     return old_session_request(self, method, url, *args, **kwargs)
 requests.Session.request = new_session_request
 
-old_get = requests.get
-old_post = requests.post
-def new_get(url, *args, **kwargs):
+# 模块级 requests.get/post 统一走连接池复用 TCP/TLS 连接（常驻模式下连接一直保持热）
+# Session 不保证线程安全，每个线程各用一个 Session；各 Session 挂载同一个 HTTPAdapter，
+# 线程池每轮重建也能复用池中的连接，池大小按并发线程数（HOT_FETCH_WORKERS）设置
+# 经 Session.request 发出，仍走上面的 new_session_request（verify=False 与完整 User-Agent）
+_HTTP_LOCAL = threading.local()
+_HTTP_ADAPTER = {}
+_HTTP_ADAPTER_LOCK = threading.Lock()
+def get_http_session():
+    session = getattr(_HTTP_LOCAL, 'session', None)
+    if session is None:
+        with _HTTP_ADAPTER_LOCK:
+            if 'adapter' not in _HTTP_ADAPTER:
+                _HTTP_ADAPTER['adapter'] = requests.adapters.HTTPAdapter(pool_maxsize=max(10, HOT_FETCH_WORKERS + 2))
+        session = requests.Session()
+        session.mount('http://', _HTTP_ADAPTER['adapter'])
+        session.mount('https://', _HTTP_ADAPTER['adapter'])
+        _HTTP_LOCAL.session = session
+    return session
+def new_get(url, params=None, **kwargs):
     kwargs['verify'] = False
     kwargs.setdefault('headers', {})['User-Agent'] = 'Mozilla/5.0'
-    return old_get(url, *args, **kwargs)
-def new_post(url, *args, **kwargs):
+    return get_http_session().request('GET', url, params=params, **kwargs)
+def new_post(url, data=None, json=None, **kwargs):
     kwargs['verify'] = False
     kwargs.setdefault('headers', {})['User-Agent'] = 'Mozilla/5.0'
-    return old_post(url, *args, **kwargs)
+    return get_http_session().request('POST', url, data=data, json=json, **kwargs)
 requests.get = new_get
 requests.post = new_post
 
 import akshare as ak
+import numpy as np
 import pandas as pd
 
 # 配置
@@ -69,8 +102,15 @@ os.makedirs(CACHE_DIR, exist_ok=True)
 # 🗄️ 缓存配置
 # ==========================================
 NAV_CACHE_FILE = os.path.join(CACHE_DIR, "nav_cache.json")  # T-1净值缓存
-NAV_HISTORY_CACHE_FILE = os.path.join(CACHE_DIR, "nav_history_cache.json")  # 历史净值缓存
-PRICE_HISTORY_CACHE_FILE = os.path.join(CACHE_DIR, "price_history_cache.json")  # 历史价格缓存
+NAV_HISTORY_CACHE_FILE = os.path.join(CACHE_DIR, "nav_history_cache.json")  # 旧版历史净值缓存（仅用于导入历史面板）
+PRICE_HISTORY_CACHE_FILE = os.path.join(CACHE_DIR, "price_history_cache.json")  # 旧版历史价格缓存（仅用于导入历史面板）
+HISTORY_DAYS = 60  # 历史面板保留的交易日数
+
+# 申购状态缓存：最多每天变化一次，超过 TTL 或跨过早间刷新时间点才重新请求（--refresh-status 强制刷新）
+SUBSCRIBE_CACHE_FILE = os.path.join(CACHE_DIR, "subscribe_status.json")
+TRADE_CALENDAR_CACHE_FILE = os.path.join(CACHE_DIR, "trade_calendar.json")  # A股交易日历（每天刷新一次）
+SUBSCRIBE_TTL_HOURS = float(os.environ.get('LOF_SUBSCRIBE_TTL_HOURS', '24'))
+SUBSCRIBE_REFRESH_AT = (9, 0)  # 每天早间刷新时间点（开盘前）
 
 
 def get_today_str():
@@ -78,26 +118,64 @@ def get_today_str():
     return date.today().strftime('%Y-%m-%d')
 
 
+# 进程内缓存：同一进程内只读一次磁盘，常驻模式下后续轮次直接复用内存中的缓存
+_MEMORY_CACHE = {}
+
+
 def load_cache(cache_file):
-    """加载缓存文件"""
+    """加载缓存文件（优先返回进程内缓存）"""
+    if cache_file in _MEMORY_CACHE:
+        return _MEMORY_CACHE[cache_file]
+    data = {}
     if os.path.exists(cache_file):
         try:
             with open(cache_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
+                data = json.load(f)
         except:
             pass
-    return {}
+    _MEMORY_CACHE[cache_file] = data
+    return data
 
 
 def save_cache(cache_file, data):
-    """保存缓存文件"""
+    """保存缓存文件（同时更新进程内缓存）"""
+    _MEMORY_CACHE[cache_file] = data
     with open(cache_file, 'w', encoding='utf-8') as f:
         json.dump(data, f, ensure_ascii=False, indent=2)
 
 
-def get_codes_hash(codes):
-    """计算基金代码列表的hash，用于判断是否需要更新历史数据"""
-    return hashlib.md5(','.join(sorted(codes)).encode()).hexdigest()[:16]
+# clean_numeric 与 NUMERIC_PLACEHOLDERS 在 economic/fetch_data.py、lof_arbitrage/fetch_data.py、
+# dividend/fetch_stocks.py 中各有一份且必须保持一致：三个目录是各自独立运行的脚本（run.sh 按路径启动，
+# 没有共享包），修改时三处同步
+NUMERIC_PLACEHOLDERS = {'', '-', '--', '---', 'None', 'nan', '<NA>'}  # 各数据源表示缺失的占位文本
+
+def clean_numeric(values):
+    """
+    向量化数值清洗：整列转 float（去掉 % , 亿），无法解析的置为 NaN，逐项结果与 clean_value 一致
+    """
+    if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+        return values.astype(float)
+    if values.empty:
+        return pd.Series(index=values.index, name=values.name, dtype=float)
+    # 不用 values.str.replace + pd.to_numeric：未装 pyarrow 时 .str 方法是逐元素的 Python 循环，
+    # 三次 replace 加一次 notna 掩码并不比 apply(clean_value) 快。改为用行情数据里不会出现的 '\x00'
+    # 把整列拼成一个字符串，3 次 str.replace 在 C 层一次扫完，再 split 回原长度交给 np.array 解析；
+    # 缺失值 str() 后为 'nan' / 'None'，解析结果本身就是 NaN，无需再按 notna 掩码
+    text = '\x00'.join(map(str, values.tolist()))
+    for noise in ('%', ',', '亿'):
+        text = text.replace(noise, '')
+    parts = text.split('\x00')
+    try:
+        result = np.array(parts, dtype=float)
+    except ValueError:
+        # 含 '' / '--' 等占位符或无法解析的文本时才逐项处理，最后由 pd.to_numeric 把剩余文本置为 NaN
+        parts = ['nan' if part.strip() in NUMERIC_PLACEHOLDERS else part for part in parts]
+        try:
+            result = np.array(parts, dtype=float)
+        except ValueError:
+            result = pd.to_numeric(pd.Series(parts, dtype=object), errors='coerce').to_numpy(dtype=float)
+    return pd.Series(result, index=values.index, name=values.name)
+
 
 # 热门LOF基金列表
 HOT_LOF_LIST = [
@@ -228,97 +306,184 @@ SETTLEMENT_DAYS = {
 }
 
 
+# 分类优先级（特殊类型优先）：商品 > QDII全球 > QDII港股 > A股行业 > A股宽基
+FUND_TYPE_PRIORITY = ['commodity', 'us_global', 'hk_qdii', 'a_stock_sector', 'a_stock_broad']
+
+# 可选的分类配置文件（可用环境变量 LOF_FUND_TYPES 指定路径），新增/调整类型无需改代码：
+# {
+#   "categories": {"bond": {"keywords": ["债"], "threshold": 0.8, "type_name": "债券", "settlement_days": 2}},
+#   "priority": ["bond", "commodity", ...]   // 可选，未列出的类型按内置顺序排在后面
+# }
+# categories 中与内置同名的类型整项覆盖，新类型追加；settlement_days 写入 SETTLEMENT_DAYS
+FUND_TYPES_CONFIG = os.environ.get('LOF_FUND_TYPES', os.path.join(SCRIPT_DIR, "fund_types.json"))
+
+
+def load_fund_type_config(path=FUND_TYPES_CONFIG):
+    """加载分类配置文件（不存在则使用内置表），并重新编译匹配器"""
+    global FUND_TYPE_PRIORITY
+    if path and os.path.exists(path):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                config = json.load(f)
+            categories = config.get('categories', {})
+            for fund_type, category in categories.items():
+                FUND_TYPE_KEYWORDS[fund_type] = category
+                if 'settlement_days' in category:
+                    SETTLEMENT_DAYS[category['type_name']] = category['settlement_days']
+            priority = [t for t in config.get('priority', []) if t in FUND_TYPE_KEYWORDS]
+            FUND_TYPE_PRIORITY = list(dict.fromkeys(priority + FUND_TYPE_PRIORITY + list(categories)))
+            print(f"📋 已加载基金分类配置: {path} ({len(categories)} 个类型)")
+        except Exception as e:
+            print(f"⚠️ 基金分类配置加载失败，使用内置分类: {e}")
+    compile_fund_type_matchers()
+
+
+def compile_fund_type_matchers():
+    """每个类型的关键词编译为一个不区分大小写的正则（按优先级排列）"""
+    global _FUND_TYPE_MATCHERS
+    _FUND_TYPE_MATCHERS = [
+        (re.compile('|'.join(map(re.escape, FUND_TYPE_KEYWORDS[t]['keywords'])), re.IGNORECASE), FUND_TYPE_KEYWORDS[t])
+        for t in FUND_TYPE_PRIORITY if FUND_TYPE_KEYWORDS[t]['keywords']
+    ]
+    classify_fund.cache_clear()
+
+
+@lru_cache(maxsize=4096)
 def classify_fund(name):
     """
     根据基金名称识别基金类型，返回(类型名称, 溢价阈值, 结算天数)
-    优先级：商品 > QDII全球 > QDII港股 > A股行业 > A股宽基
+    按 FUND_TYPE_PRIORITY 依次匹配预编译正则，结果按名称缓存
     """
-    name_lower = name.lower()
+    for pattern, config in _FUND_TYPE_MATCHERS:
+        if pattern.search(name):
+            type_name = config['type_name']
+            return type_name, config['threshold'], SETTLEMENT_DAYS.get(type_name, 2)
     
-    # 按优先级检查（特殊类型优先）
-    priority_order = ['commodity', 'us_global', 'hk_qdii', 'a_stock_sector', 'a_stock_broad']
-    
-    for fund_type in priority_order:
+    return '其他', DEFAULT_THRESHOLD, 2
+
+
+def _classify_fund_loop(name):
+    """逐关键词子串匹配的原实现，仅用于基准对比"""
+    name_lower = name.lower()
+    for fund_type in FUND_TYPE_PRIORITY:
         config = FUND_TYPE_KEYWORDS[fund_type]
         for keyword in config['keywords']:
             if keyword in name or keyword.lower() in name_lower:
                 type_name = config['type_name']
                 return type_name, config['threshold'], SETTLEMENT_DAYS.get(type_name, 2)
-    
     return '其他', DEFAULT_THRESHOLD, 2
 
 
+def benchmark_classify_fund(repeat=20):
+    """微基准：全部LOF名称上对比 逐关键词循环 / 预编译正则 / 预编译正则+LRU缓存"""
+    names = [name for _, name, _ in HOT_LOF_LIST]
+    if os.path.exists(OUTPUT_PATH):
+        with open(OUTPUT_PATH, 'r', encoding='utf-8') as f:
+            match = re.search(r'export const LOF_DATA = ({.*?});\n', f.read(), re.S)
+        if match:
+            names = [fund['name'] for fund in json.loads(match.group(1))['all_funds']]
+    
+    def run(func):
+        start = time.perf_counter()
+        for name in names:
+            func(name)
+        return time.perf_counter() - start
+    
+    uncached = classify_fund.__wrapped__
+    t_loop = min(run(_classify_fund_loop) for _ in range(repeat))
+    t_regex = min(run(uncached) for _ in range(repeat))
+    classify_fund.cache_clear()
+    run(classify_fund)  # 预热缓存（相当于常驻模式第二轮起）
+    t_cached = min(run(classify_fund) for _ in range(repeat))
+    same = all(_classify_fund_loop(name) == classify_fund(name) for name in names)
+    
+    print(f"📏 基金分类基准 ({len(names)} 个名称, 取 {repeat} 次最优)")
+    print(f"   逐关键词循环 {t_loop * 1000:7.2f}ms")
+    print(f"   预编译正则   {t_regex * 1000:7.2f}ms | 加速 {t_loop / t_regex:5.1f}x")
+    print(f"   正则+LRU缓存 {t_cached * 1000:7.2f}ms | 加速 {t_loop / t_cached:5.1f}x | 结果一致 {same}")
+
+
+load_fund_type_config()
+
+
+# IOPV 可信度：各类型的默认说明，以及估值波动 > 5% 时的警告前缀（A股类型不警告）
+IOPV_REASONS = {
+    'A股宽基': 'A股IOPV跟踪准确',
+    'A股行业': 'A股IOPV跟踪准确',
+    'QDII港股': '港股IOPV',
+    'QDII全球': '全球IOPV',
+    '商品原油': '商品IOPV',
+}
+IOPV_VOLATILE_REASONS = {
+    'QDII港股': '港股估值波动较大',
+    'QDII全球': '全球市场估值波动',
+    '商品原油': '商品类波动',
+}
+
+
 def calculate_iopv_reliability(fund_type, est_change_pct):
     """
-    计算IOPV可信度（简化版，减少过度警告）
+    计算IOPV可信度（简化版，减少过度警告），整列计算
     
     核心原则：
     - A股类型：IOPV基本可靠，不需要过度警告
-    - QDII类型：仅在极端情况下给出警告
+    - QDII/商品类型：仅在估值波动 > 5% 时给出警告
     
-    返回: (reliability: 'high'|'medium'|'low', reason: str)
+    返回: (reliability: 'high'|'medium' 序列, reason 序列)
     """
-    est_change = abs(est_change_pct) if est_change_pct else 0
+    est_change = est_change_pct.fillna(0).abs()
+    volatile = fund_type.isin(IOPV_VOLATILE_REASONS) & (est_change > 5)
     
-    # A股类型：IOPV可信度高（无论盘中还是收盘后）
-    if fund_type in ['A股宽基', 'A股行业']:
-        return 'high', 'A股IOPV跟踪准确'
-    
-    # 港股QDII - 仅在极端波动时警告
-    if fund_type == 'QDII港股':
-        if est_change > 5:
-            return 'medium', f'港股估值波动较大({est_change:.1f}%)'
-        return 'high', '港股IOPV'
-    
-    # 美股/全球QDII - 仅在极端波动时警告
-    if fund_type == 'QDII全球':
-        if est_change > 5:
-            return 'medium', f'全球市场估值波动({est_change:.1f}%)'
-        return 'high', '全球IOPV'
-    
-    # 商品原油 - 波动大时警告
-    if fund_type == '商品原油':
-        if est_change > 5:
-            return 'medium', f'商品类波动({est_change:.1f}%)'
-        return 'high', '商品IOPV'
-    
-    return 'high', 'IOPV'
+    reliability = pd.Series(np.where(volatile, 'medium', 'high'), index=fund_type.index)
+    reason = fund_type.map(IOPV_REASONS).fillna('IOPV')
+    if volatile.any():
+        reason[volatile] = [
+            f'{prefix}({change:.1f}%)'
+            for prefix, change in zip(fund_type[volatile].map(IOPV_VOLATILE_REASONS), est_change[volatile].tolist())
+        ]
+    return reliability, reason
 
 
-def determine_arb_path(discount, threshold, can_subscribe, fund_type, iopv_reliability):
+def determine_arb_path(discount, threshold, can_subscribe):
     """
-    判断套利路径（简化版）
+    判断套利路径（简化版），整列计算
     
     核心区分：
     1. in_to_out: 场内卖出 + 场外申购 → 可套利
     2. price_reversion: 单纯赌价格回归 → 无法申购
     3. none: 未达阈值
     
-    返回: (arb_path, arb_path_desc)
+    返回: (arb_path 数组, arb_path_desc 数组)
     """
-    if discount < threshold:
-        return 'none', '未达套利阈值'
-    
-    if can_subscribe:
-        return 'in_to_out', '场内→场外套利（经典LOF套利）'
-    else:
-        return 'price_reversion', '价格回归博弈（无法申购，非无风险套利）'
+    conditions = [discount < threshold, can_subscribe]
+    arb_path = np.select(conditions, ['none', 'in_to_out'], 'price_reversion')
+    arb_path_desc = np.select(
+        conditions,
+        ['未达套利阈值', '场内→场外套利（经典LOF套利）'],
+        '价格回归博弈（无法申购，非无风险套利）',
+    )
+    return arb_path, arb_path_desc
 
 
-def calculate_capital_efficiency(discount, settlement_days, fund_type):
+def calculate_capital_efficiency(discount, settlement_days):
     """
-    计算资金效率评分
+    计算资金效率评分，整列计算
     
     套利不是看百分比，而是看：年化收益 × 周转率 × 资金占用
     
     公式：年化收益率 = 溢价率 / 结算天数 × 365
     评分：0-100，考虑收益率和周转效率
+    返回: (年化收益率数组, 评分数组)，float64 未取整；折价或结算天数无效时均为 0.0
+    逐行旧版本函数本身返回整数 0 / 100，但结果先写入 DataFrame 列（整列 float64）再输出，
+    lof_data.ts 中一直是 0.0 / 100.0；这里直接返回浮点，输出的值与类型都与旧版一致
     """
-    if discount <= 0 or settlement_days <= 0:
-        return 0, 0
+    discount = np.asarray(discount, dtype=float)
+    settlement_days = np.asarray(settlement_days, dtype=float)
+    valid = (discount > 0) & (settlement_days > 0)
     
     # 年化收益率（简化计算，不考虑复利）
-    annualized_return = (discount / settlement_days) * 365
+    with np.errstate(divide='ignore', invalid='ignore'):
+        annualized_return = np.where(valid, (discount / settlement_days) * 365, 0.0)
     
     # 评分逻辑：
     # - 年化 > 100%: 满分100
@@ -326,43 +491,46 @@ def calculate_capital_efficiency(discount, settlement_days, fund_type):
     # - 年化 20-50%: 60-80
     # - 年化 10-20%: 40-60
     # - 年化 < 10%: 0-40
-    
-    if annualized_return >= 100:
-        score = 100
-    elif annualized_return >= 50:
-        score = 80 + (annualized_return - 50) / 50 * 20
-    elif annualized_return >= 20:
-        score = 60 + (annualized_return - 20) / 30 * 20
-    elif annualized_return >= 10:
-        score = 40 + (annualized_return - 10) / 10 * 20
-    else:
-        score = annualized_return / 10 * 40
-    
-    return round(annualized_return, 1), round(score, 0)
+    ar = annualized_return
+    score = np.select(
+        [ar >= 100, ar >= 50, ar >= 20, ar >= 10],
+        [100.0, 80 + (ar - 50) / 50 * 20, 60 + (ar - 20) / 30 * 20, 40 + (ar - 10) / 10 * 20],
+        ar / 10 * 40,
+    )
+    return annualized_return, np.where(valid, score, 0.0)
 
 
-def generate_risk_notes(fund_type, iopv_reliability, est_change_pct, discount, settlement_days):
+def generate_risk_notes(est_change_pct, settlement_days):
     """
-    生成风险提示（精简版，只提示关键风险）
+    生成风险提示（精简版，只提示关键风险），返回与输入等长的列表
     """
-    notes = []
-    
-    # 只在结算周期长时提示
-    if settlement_days >= 4:
-        notes.append(f'⏰ T+{settlement_days}结算，资金占用较长')
-    
-    # 只在波动特别大时提示
-    if est_change_pct and abs(est_change_pct) > 3:
-        direction = '上涨' if est_change_pct > 0 else '下跌'
-        notes.append(f'📈 今日估值{direction}{abs(est_change_pct):.1f}%')
-    
-    return notes
+    notes_list = []
+    for change, days in zip(est_change_pct.fillna(0).tolist(), settlement_days.tolist()):
+        notes = []
+        
+        # 只在结算周期长时提示
+        if days >= 4:
+            notes.append(f'⏰ T+{days}结算，资金占用较长')
+        
+        # 只在波动特别大时提示
+        if change and abs(change) > 3:
+            direction = '上涨' if change > 0 else '下跌'
+            notes.append(f'📈 今日估值{direction}{abs(change):.1f}%')
+        
+        notes_list.append(notes)
+    return notes_list
+
+
+def _round_list(values, ndigits, default=None):
+    """整列转 Python 列表并逐个 round（与原先逐行 round 结果完全一致），缺失值用 default"""
+    return [round(v, ndigits) if v == v else default for v in values.tolist()]
 
 
-def get_realtime_estimation():
+def get_realtime_estimation(codes=None):
     """
     获取基金实时估值数据
     这是盘中根据持仓和指数涨跌估算的净值，而非T-1公布净值
+    codes 给定时（LOF场内代码）先按代码过滤全市场约1万行，再做列解析
     """
     print("📊 获取基金实时估值（盘中IOPV估算）...")
     
@@ -379,15 +547,21 @@ def get_realtime_estimation():
         prev_nav_cols = [c for c in df.columns if '单位净值' in c and '公布' not in c]
         prev_nav_col = prev_nav_cols[-1] if prev_nav_cols else None
         
+        # 早过滤：只保留LOF代码，后续的数值/百分号解析只作用于几百行
+        total = len(df)
+        if codes is not None:
+            df = df[df['基金代码'].astype(str).isin(set(map(str, codes)))]
+        
         result = pd.DataFrame({
             'code': df['基金代码'].astype(str),
             'name': df['基金名称'],
             'est_nav': pd.to_numeric(df[est_col], errors='coerce'),  # 实时估算净值
-            'est_change_pct': df[est_rate_col].str.replace('%', '').astype(float, errors='ignore'),
+            'est_change_pct': clean_numeric(df[est_rate_col]),
             'prev_nav': pd.to_numeric(df[prev_nav_col], errors='coerce') if prev_nav_col else None,
         })
         
-        print(f"✅ 获取到 {len(result)} 只基金实时估值")
+        scope = f"（全市场 {total} 只，按LOF代码过滤）" if codes is not None else ""
+        print(f"✅ 获取到 {len(result)} 只基金实时估值{scope}")
         return result
         
     except Exception as e:
@@ -425,11 +599,24 @@ def get_lof_spot():
         return None
 
 
-def get_fund_subscribe_status():
+def get_fund_subscribe_status(codes=None, force=False):
     """
-    获取基金申购状态
+    获取基金申购状态（带TTL缓存）
     这是套利的生死线！80%的LOF溢价 = 申购暂停，永远无法套利
+    codes 给定时只保留这些代码（LOF场内代码）；缓存未过期且覆盖全部 codes 时不请求接口，force=True 强制刷新
     """
+    codes = None if codes is None else set(map(str, codes))
+    
+    if not force:
+        cache = load_cache(SUBSCRIBE_CACHE_FILE)
+        universe = set(cache.get('_universe', []))
+        if is_subscribe_cache_fresh(cache.get('_updated_at')) and (codes is None or codes <= universe):
+            status_dict = cache['status']
+            if codes is not None:
+                status_dict = {code: status_dict[code] for code in codes if code in status_dict}
+            print(f"📊 申购状态使用缓存 ({cache['_updated_at']}，{len(status_dict)} 只)")
+            return status_dict
+    
     print("📊 获取基金申购状态...")
     
     try:
@@ -439,35 +626,47 @@ def get_fund_subscribe_status():
             print("❌ 获取申购状态失败")
             return {}
         
-        # 构建申购状态字典
+        # 先按代码过滤再整列处理；同一代码多行时以最后一行为准
+        fund_codes = df['基金代码'].astype(str)
+        if codes is not None:
+            df = df[fund_codes.isin(codes)]
+            fund_codes = fund_codes[df.index]
+        keep = ~fund_codes.duplicated(keep='last')
+        df, fund_codes = df[keep], fund_codes[keep]
+        
         # 申购状态: 开放申购、暂停申购、限大额、封闭期、认购期、场内交易
-        status_dict = {}
-        for _, row in df.iterrows():
-            code = str(row['基金代码'])
-            subscribe_status = row['申购状态']
-            redeem_status = row['赎回状态']
-            daily_limit = row['日累计限定金额']  # 限额（万元）
-            
-            # 判断是否可申购
-            # 开放申购 / 限大额 = 可以申购（限大额对散户影响不大）
-            # 暂停申购 / 封闭期 / 认购期 = 不可申购
-            can_subscribe = subscribe_status in ['开放申购', '限大额']
-            
-            # 处理限额：akshare返回的单位是【元】
-            # 超过10亿视为无限额（akshare返回1e11表示无限额）
-            limit_value = float(daily_limit) if pd.notna(daily_limit) else None
-            if limit_value and limit_value >= 1e9:  # 超过10亿视为无限额
-                limit_value = None
-            
-            status_dict[code] = {
-                'subscribe_status': subscribe_status,
-                'redeem_status': redeem_status,
-                'can_subscribe': can_subscribe,
-                'daily_limit': limit_value,  # 单位：元
+        # 开放申购 / 限大额 = 可以申购（限大额对散户影响不大）
+        # 暂停申购 / 封闭期 / 认购期 = 不可申购
+        subscribe_status = df['申购状态']
+        can_subscribe = subscribe_status.isin(['开放申购', '限大额'])
+        
+        # 处理限额：akshare返回的单位是【元】
+        # 超过10亿视为无限额（akshare返回1e11表示无限额）
+        daily_limit = pd.to_numeric(df['日累计限定金额'], errors='coerce')
+        daily_limit = daily_limit.mask(daily_limit >= 1e9)
+        
+        status_dict = {
+            code: {
+                'subscribe_status': status,
+                'redeem_status': redeem,
+                'can_subscribe': can,
+                'daily_limit': limit if limit == limit else None,  # 单位：元
             }
+            for code, status, redeem, can, limit in zip(
+                fund_codes.tolist(), subscribe_status.where(subscribe_status.notna(), None).tolist(),
+                df['赎回状态'].where(df['赎回状态'].notna(), None).tolist(),
+                can_subscribe.tolist(), daily_limit.tolist(),
+            )
+        }
         
-        open_count = sum(1 for v in status_dict.values() if v['can_subscribe'])
+        open_count = int(can_subscribe.sum())
         print(f"✅ 获取到 {len(status_dict)} 只基金申购状态，其中 {open_count} 只可申购")
+        
+        save_cache(SUBSCRIBE_CACHE_FILE, {
+            '_updated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            '_universe': sorted(codes) if codes is not None else sorted(status_dict),
+            'status': status_dict,
+        })
         return status_dict
         
     except Exception as e:
@@ -475,6 +674,262 @@ def get_fund_subscribe_status():
         return {}
 
 
+def is_subscribe_cache_fresh(updated_at, now=None):
+    """申购状态缓存是否仍有效：未超过 TTL，且不早于当天的早间刷新时间点"""
+    if not updated_at:
+        return False
+    now = now or datetime.now()
+    updated = datetime.strptime(updated_at, '%Y-%m-%d %H:%M:%S')
+    if (now - updated).total_seconds() > SUBSCRIBE_TTL_HOURS * 3600:
+        return False
+    morning = now.replace(hour=SUBSCRIBE_REFRESH_AT[0], minute=SUBSCRIBE_REFRESH_AT[1], second=0, microsecond=0)
+    return not (updated < morning <= now)
+
+
+def get_bulk_nav_table():
+    """
+    一次请求拉取全市场开放式基金的最新单位净值
+    返回 ({基金代码: 单位净值}, 最新一期日期, {基金代码: 净值日期}（仅记录未取到最新一期、用了上一期的基金）)
+    表中按日期给出最近两期净值列（如 "2025-12-22-单位净值"），当天未公布时取上一期
+    """
+    print("📊 批量获取开放式基金T-1净值...")
+    
+    try:
+        df = ak.fund_open_fund_daily_em()
+        
+        if df is None or df.empty:
+            print("❌ 批量获取T-1净值失败")
+            return {}, None, {}
+        
+        # 日期在列名开头，字符串倒序即最新一期在前
+        nav_cols = sorted([c for c in df.columns if str(c).endswith('单位净值')], reverse=True)
+        if not nav_cols:
+            print("❌ 批量获取T-1净值失败: 未找到单位净值列")
+            return {}, None, {}
+        
+        codes = df['基金代码'].astype(str)
+        navs = clean_numeric(df[nav_cols[0]])
+        nav_dates = pd.Series(None, index=df.index, dtype=object)
+        for col in nav_cols[1:]:
+            older = clean_numeric(df[col])
+            nav_dates = nav_dates.mask(navs.isna() & older.notna(), col[:10])
+            navs = navs.fillna(older)
+        
+        valid = navs.notna() & (navs > 0)
+        nav_table = dict(zip(codes[valid].tolist(), navs[valid].tolist()))
+        stale = valid & nav_dates.notna()
+        stale_dates = dict(zip(codes[stale].tolist(), nav_dates[stale].tolist()))
+        
+        print(f"✅ 获取到 {len(nav_table)} 只基金T-1净值 ({nav_cols[0][:10]})")
+        return nav_table, nav_cols[0][:10], stale_dates
+        
+    except Exception as e:
+        print(f"❌ 批量获取T-1净值失败: {e}")
+        return {}, None, {}
+
+
+def load_nav_cache():
+    """
+    加载当天的T-1净值缓存；当天首次调用时批量拉取全市场净值表写入缓存（每天只请求一次）
+    缓存格式：{'_date': 日期, '_bulk': 是否已批量拉取, '_nav_date': 最新一期净值日期,
+              '_nav_dates': {基金代码: 净值日期（与最新一期不同的才记录）}, 基金代码: 单位净值, ...}
+    """
+    nav_cache = load_cache(NAV_CACHE_FILE)
+    today = get_today_str()
+    
+    # 检查缓存是否是今天的
+    if nav_cache.get('_date', '') != today:
+        nav_cache = {'_date': today}  # 重置缓存
+    
+    if not nav_cache.get('_bulk'):
+        nav_table, nav_date, stale_dates = get_bulk_nav_table()
+        if nav_table:
+            nav_cache.update(nav_table)
+            nav_cache['_bulk'] = True
+            nav_cache['_nav_date'] = nav_date
+            nav_cache['_nav_dates'] = stale_dates
+            save_cache(NAV_CACHE_FILE, nav_cache)
+    
+    return nav_cache
+
+
+def get_cached_nav_point(nav_cache, code):
+    """从当天净值缓存取 (净值日期, 单位净值)，日期未知时返回 None"""
+    if code not in nav_cache:
+        return None
+    nav_date = nav_cache.get('_nav_dates', {}).get(code, nav_cache.get('_nav_date'))
+    if not nav_date:
+        return None
+    return nav_date, nav_cache[code]
+
+
+# ==========================================
+# 📐 指数推算IOPV（无实时估值的指数LOF）
+# ==========================================
+# 指数名称 -> 新浪指数行情代码；同时用于 HOT_LOF_LIST 的跟踪指数和基金名称中的指数全称匹配
+INDEX_QUOTE_SYMBOLS = {
+    '上证50AH优选': 'sh000170',
+    '上证50AH': 'sh000170',
+    '上证50': 'sh000016',
+    '沪深300': 'sh000300',
+    '中证500': 'sh000905',
+    '中证1000': 'sh000852',
+    '基本面50': 'sh000925',
+    '科创50': 'sh000688',
+    '深证100': 'sz399330',
+    '中小企业100': 'sz399005',
+    '中证白酒': 'sz399997',
+    '中证煤炭': 'sz399998',
+    '中证新能源汽车': 'sz399976',
+    '国证有色金属': 'sz399395',
+    '中证军工': 'sz399967',
+    '中证国防': 'sz399973',
+    '中证传媒': 'sz399971',
+    '中证环保': 'sh000827',
+    '中证银行': 'sz399986',
+    '中证证券': 'sz399975',
+}
+# HOT_LOF_LIST 中的简称 -> 指数全称（名称太泛、不宜直接匹配基金名称的指数只通过这里关联）
+TRACK_INDEX_ALIASES = {
+    '新能源车': '中证新能源汽车',
+    '有色金属': '国证有色金属',
+}
+# 指数基金股票仓位（其余为现金，不随指数波动）
+IOPV_EQUITY_WEIGHT = 0.95
+
+_INDEX_NAME_PATTERN = '(' + '|'.join(map(re.escape, sorted(INDEX_QUOTE_SYMBOLS, key=len, reverse=True))) + ')'
+
+
+def resolve_track_index(codes, names):
+    """
+    确定每只基金跟踪指数的行情代码：HOT_LOF_LIST 登记的优先，其次按基金名称中的指数全称匹配
+    HOT_LOF_LIST 的代码可能已对应其他基金，只有当前名称包含跟踪指数关键词（去掉中证/国证等前缀）时才采用
+    返回与 codes 同索引的 Series，无法确定时为 NaN
+    """
+    hot = {}
+    for code, _, track in HOT_LOF_LIST:
+        symbol = INDEX_QUOTE_SYMBOLS.get(TRACK_INDEX_ALIASES.get(track, track))
+        if symbol:
+            hot[code] = (symbol, re.sub(r'^(中证|国证|上证|深证|沪深)', '', track))
+    names = names.astype(str)
+    by_hot = pd.Series(
+        [hot[code][0] if code in hot and hot[code][1] in name else np.nan for code, name in zip(codes, names)],
+        index=codes.index, dtype=object,
+    )
+    by_name = names.str.extract(_INDEX_NAME_PATTERN, expand=False).map(INDEX_QUOTE_SYMBOLS)
+    return by_hot.fillna(by_name)
+
+
+def get_index_spot_change():
+    """一次请求拉取沪深全部指数的盘中行情，返回 {行情代码: 涨跌幅%}"""
+    print("    📊 批量获取指数盘中行情...")
+    try:
+        df = ak.stock_zh_index_spot_sina()
+        if df is None or df.empty:
+            return {}
+        change = clean_numeric(df['涨跌幅'])
+        valid = change.notna()
+        return dict(zip(df['代码'].astype(str)[valid].tolist(), change[valid].tolist()))
+    except Exception as e:
+        print(f"    ❌ 获取指数行情失败: {e}")
+        return {}
+
+
+def load_trade_calendar():
+    """A股交易日历（YYYY-MM-DD 升序列表），每天最多请求一次；获取失败时沿用旧缓存，都没有返回 None"""
+    cache = load_cache(TRADE_CALENDAR_CACHE_FILE)
+    today = get_today_str()
+    if cache.get('_date') == today and cache.get('days'):
+        return cache['days']
+    try:
+        df = ak.tool_trade_date_hist_sina()
+        days = sorted(str(d)[:10] for d in df['trade_date'].tolist())
+        save_cache(TRADE_CALENDAR_CACHE_FILE, {'_date': today, 'days': days})
+        return days
+    except Exception as e:
+        print(f"    ⚠️ 获取交易日历失败，按工作日判断: {e}")
+        return cache.get('days') or None
+
+
+def get_index_quote_date(now=None, calendar=None):
+    """
+    指数行情涨跌幅所属的交易日：今天是交易日且已开盘（9:30）为今天，否则为今天之前最近一个交易日
+    （周末、节假日和开盘前，新浪指数行情仍显示上一交易日的涨跌幅）；calendar 为空时按工作日近似
+    """
+    now = now or datetime.now()
+    today = now.strftime('%Y-%m-%d')
+    opened = (now.hour, now.minute) >= TRADING_SESSIONS[0][0]
+    if calendar:
+        i = bisect.bisect_right(calendar, today) if opened else bisect.bisect_left(calendar, today)
+        return calendar[i - 1] if i else None
+    day = now.date() if opened else now.date() - timedelta(days=1)
+    while day.weekday() >= 5:
+        day -= timedelta(days=1)
+    return day.isoformat()
+
+
+def index_change_is_new(nav_date, now=None, calendar=None):
+    """指数涨跌幅是否发生在净值日之后（否则这段涨跌已包含在净值里，再推算会重复计算）"""
+    quote_date = get_index_quote_date(now, calendar)
+    return bool(nav_date and quote_date and quote_date > nav_date)
+
+
+# 金标样例：(当前时间, 净值日期, 是否应叠加指数涨跌幅)，日历为样例交易日（2026-10-01~08 国庆休市）
+INDEX_QUOTE_GOLDEN_CALENDAR = [d.strftime('%Y-%m-%d') for d in pd.bdate_range('2026-09-21', '2026-10-23')
+                               if not ('2026-10-01' <= d.strftime('%Y-%m-%d') <= '2026-10-08')]
+INDEX_QUOTE_GOLDEN_SAMPLES = [
+    ('2026-10-17 10:00', '2026-10-16', False),  # 周六：行情仍是周五的涨跌幅
+    ('2026-10-18 20:00', '2026-10-16', False),  # 周日
+    ('2026-10-19 09:00', '2026-10-16', False),  # 周一开盘前
+    ('2026-10-19 09:30', '2026-10-16', True),   # 周一开盘
+    ('2026-10-16 09:15', '2026-10-15', False),  # 交易日集合竞价，尚未开盘
+    ('2026-10-16 10:00', '2026-10-15', True),   # 盘中
+    ('2026-10-16 20:00', '2026-10-15', True),   # 收盘后当天净值未公布
+    ('2026-10-16 22:00', '2026-10-16', False),  # 当天净值已公布
+    ('2026-10-05 10:00', '2026-09-30', False),  # 节假日
+    ('2026-10-09 10:00', '2026-09-30', True),   # 节后首个交易日
+]
+
+
+def check_index_quote_date():
+    """金标校验：周末/节假日/开盘前不叠加上一交易日的指数涨跌幅（含无交易日历时的工作日近似）"""
+    failures = []
+    for when, nav_date, expected in INDEX_QUOTE_GOLDEN_SAMPLES:
+        now = datetime.strptime(when, '%Y-%m-%d %H:%M')
+        for calendar in (INDEX_QUOTE_GOLDEN_CALENDAR, None):
+            # 无日历时按工作日近似，节假日无法识别，跳过节假日样例
+            if calendar is None and get_index_quote_date(now, INDEX_QUOTE_GOLDEN_CALENDAR) != get_index_quote_date(now):
+                continue
+            actual = index_change_is_new(nav_date, now, calendar)
+            if actual != expected:
+                failures.append((when, nav_date, calendar is not None, expected, actual))
+    for when, nav_date, with_calendar, expected, actual in failures:
+        print(f"   ❌ {when} 净值日 {nav_date} ({'交易日历' if with_calendar else '工作日近似'}): 期望 {expected}, 实际 {actual}")
+    print(f"{'✅' if not failures else '❌'} 指数推算IOPV日期校验: {len(INDEX_QUOTE_GOLDEN_SAMPLES)} 个样例, 失败 {len(failures)}")
+    return not failures
+
+
+def estimate_iopv_from_index(index_symbols, navs, nav_dates, latest_nav_date, now=None):
+    """
+    用 T-1 净值 × (1 + 仓位 × 指数盘中涨跌幅) 推算实时估值，整列计算
+    只在指数行情的交易日晚于最新一期净值日期（latest_nav_date）时推算，且只对净值是最新一期的基金推算：
+    周末/节假日/开盘前行情仍是上一交易日的涨跌幅，已包含在净值里；更早的净值与指数涨跌幅对不上
+    返回 (est_nav, est_change_pct)，不可推算的位置为 NaN
+    """
+    nan = pd.Series(np.nan, index=navs.index)
+    if not latest_nav_date or index_symbols.notna().sum() == 0:
+        return nan, nan
+    if not index_change_is_new(latest_nav_date, now, load_trade_calendar()):
+        print(f"    💤 指数行情仍是 {latest_nav_date} 及之前的涨跌幅（非交易时段），不推算")
+        return nan, nan
+    
+    index_change = get_index_spot_change()
+    change = index_symbols.map(index_change).astype(float)
+    usable = change.notna() & navs.notna() & (nav_dates == latest_nav_date)
+    est_change = (change * IOPV_EQUITY_WEIGHT).where(usable)
+    return navs * (1 + est_change / 100), est_change
+
+
 def calculate_realtime_arbitrage(spot_df, est_df, subscribe_status):
     """
     计算真实套利折溢价率
@@ -498,41 +953,31 @@ def calculate_realtime_arbitrage(spot_df, est_df, subscribe_status):
     )
     
     # 对于没有实时估值的LOF，尝试从缓存获取T-1净值
-    missing_nav_codes = merged[merged['est_nav'].isna() & merged['price'].notna()]['code'].tolist()
+    missing_mask = merged['est_nav'].isna() & merged['price'].notna()
+    missing_nav_codes = merged.loc[missing_mask, 'code'].unique().tolist()
     if missing_nav_codes:
         print(f"  📌 {len(missing_nav_codes)} 只LOF没有实时估值，尝试获取T-1净值...")
         
-        # 加载T-1净值缓存
-        nav_cache = load_cache(NAV_CACHE_FILE)
-        today = get_today_str()
-        
-        # 检查缓存是否是今天的
-        cache_date = nav_cache.get('_date', '')
-        if cache_date != today:
-            nav_cache = {'_date': today}  # 重置缓存
-        
-        codes_to_fetch = []
-        for code in missing_nav_codes[:30]:
-            if code in nav_cache:
-                # 使用缓存
-                latest_nav = nav_cache[code]
-                merged.loc[merged['code'] == code, 'est_nav'] = latest_nav
-                merged.loc[merged['code'] == code, 'prev_nav'] = latest_nav
-                print(f"    ✓ {code} T-1净值(缓存): {latest_nav}")
-            else:
-                codes_to_fetch.append(code)
-        
-        # 只请求未缓存的
+        # 加载T-1净值缓存（当天首次会批量拉取全市场净值表）
+        nav_cache = load_nav_cache()
+        
+        # 先收集全部兜底净值（缓存 + API），最后一次性写回
+        fallback_navs = {code: nav_cache[code] for code in missing_nav_codes if code in nav_cache}
+        codes_to_fetch = [code for code in missing_nav_codes if code not in nav_cache]
+        if fallback_navs:
+            print(f"    ✓ {len(fallback_navs)} 只T-1净值来自批量净值表")
+        
+        # 批量表中没有的才逐只请求
         if codes_to_fetch:
-            print(f"    📡 需要请求 {len(codes_to_fetch)} 只基金的T-1净值...")
+            print(f"    📡 批量净值表缺少 {len(codes_to_fetch)} 只，逐只请求...")
             for code in codes_to_fetch:
                 try:
                     nav_df = ak.fund_open_fund_info_em(symbol=code, indicator="单位净值走势")
                     if nav_df is not None and not nav_df.empty:
                         latest_nav = float(nav_df.iloc[-1]['单位净值'])
-                        merged.loc[merged['code'] == code, 'est_nav'] = latest_nav
-                        merged.loc[merged['code'] == code, 'prev_nav'] = latest_nav
+                        fallback_navs[code] = latest_nav
                         nav_cache[code] = latest_nav  # 写入缓存
+                        nav_cache.setdefault('_nav_dates', {})[code] = str(nav_df.iloc[-1]['净值日期'])[:10]
                         print(f"    ✓ {code} T-1净值(API): {latest_nav}")
                 except Exception as e:
                     pass
@@ -540,6 +985,26 @@ def calculate_realtime_arbitrage(spot_df, est_df, subscribe_status):
             
             # 保存缓存
             save_cache(NAV_CACHE_FILE, nav_cache)
+        
+        # 一次 map 写回：估值和T-1净值都用兜底净值
+        fallback = merged['code'].map(fallback_navs)
+        filled = missing_mask & fallback.notna()
+        merged.loc[filled, 'est_nav'] = fallback[filled]
+        merged.loc[filled, 'prev_nav'] = fallback[filled]
+        print(f"    ✅ {int(filled.sum())}/{len(missing_nav_codes)} 只LOF已用T-1净值兜底")
+        
+        # 有跟踪指数的再用指数盘中涨跌幅推算实时估值（一次批量指数行情，代替陈旧的T-1净值）
+        subset = merged[filled]
+        nav_dates = subset['code'].map(nav_cache.get('_nav_dates', {})).fillna(nav_cache.get('_nav_date'))
+        index_est, index_change = estimate_iopv_from_index(
+            resolve_track_index(subset['code'], subset['name']), subset['est_nav'].astype(float),
+            nav_dates, nav_cache.get('_nav_date'),
+        )
+        estimated = index_est.notna()
+        if estimated.any():
+            merged.loc[estimated[estimated].index, 'est_nav'] = index_est[estimated]
+            merged.loc[estimated[estimated].index, 'est_change_pct'] = index_change[estimated]
+            print(f"    📐 {int(estimated.sum())} 只指数LOF用跟踪指数盘中涨跌幅推算实时估值")
     
     # 计算实时折溢价率（核心！）
     merged['realtime_discount'] = (merged['price'] - merged['est_nav']) / merged['est_nav'] * 100
@@ -555,119 +1020,202 @@ def calculate_realtime_arbitrage(spot_df, est_df, subscribe_status):
         (merged['price'] > 0)
     ].copy()
     
-    # 判断套利信号（基于实时折溢价，使用分类阈值）
-    def get_signal(row):
-        discount = row['realtime_discount']
-        name = row['name']
-        code = row['code']
-        est_change_pct = row['est_change_pct'] if pd.notna(row['est_change_pct']) else 0
-        amount = row['amount'] / 10000 if pd.notna(row['amount']) else 0  # 转为万元
-        
-        if pd.isna(discount):
-            return (None, 0, '其他', DEFAULT_THRESHOLD, False, '', '', True,
-                    'medium', '', 'none', '', 2, 0, 0, [], None)
-        
-        # 获取基金类型、阈值和结算天数
-        fund_type, threshold, settlement_days = classify_fund(name)
-        
-        # 获取申购状态
-        status_info = subscribe_status.get(code, {})
-        can_subscribe = status_info.get('can_subscribe', True)  # 默认可申购（未查到状态）
-        subscribe_status_text = status_info.get('subscribe_status', '未知')
-        redeem_status_text = status_info.get('redeem_status', '未知')
-        daily_limit = status_info.get('daily_limit', None)  # 限额（万元）
-        
-        # 流动性判断：成交额 < 500万 = 流动性不足
-        low_liquidity = amount < MIN_AMOUNT_THRESHOLD
-        
-        # 🆕 IOPV可信度评分
-        iopv_reliability, iopv_reason = calculate_iopv_reliability(fund_type, est_change_pct)
-        
-        # 🆕 套利路径判断
-        arb_path, arb_path_desc = determine_arb_path(discount, threshold, can_subscribe, fund_type, iopv_reliability)
-        
-        # 🆕 资金效率评分
-        annualized_return, capital_efficiency = calculate_capital_efficiency(discount, settlement_days, fund_type)
-        
-        # 🆕 风险提示
-        risk_notes = generate_risk_notes(fund_type, iopv_reliability, est_change_pct, discount, settlement_days)
-        
-        # 溢价超过该类型阈值才算套利机会
-        if discount >= threshold:
-            # 信号强度：超过阈值的倍数
-            excess = discount - threshold
-            strength = min((excess / threshold) * 100, 100)
-            return ("溢价套利", round(strength, 1), fund_type, threshold, can_subscribe, 
-                    subscribe_status_text, redeem_status_text, low_liquidity,
-                    iopv_reliability, iopv_reason, arb_path, arb_path_desc,
-                    settlement_days, annualized_return, capital_efficiency, risk_notes, daily_limit)
-        
-        return (None, 0, fund_type, threshold, can_subscribe, 
-                subscribe_status_text, redeem_status_text, low_liquidity,
-                iopv_reliability, iopv_reason, arb_path, arb_path_desc,
-                settlement_days, annualized_return, capital_efficiency, risk_notes, daily_limit)
-    
-    signals = valid.apply(get_signal, axis=1, result_type='expand')
-    valid['signal_type'] = signals[0]
-    valid['signal_strength'] = signals[1]
-    valid['fund_type'] = signals[2]
-    valid['threshold'] = signals[3]
-    valid['can_subscribe'] = signals[4]
-    valid['subscribe_status'] = signals[5]
-    valid['redeem_status'] = signals[6]
-    valid['low_liquidity'] = signals[7]
-    valid['iopv_reliability'] = signals[8]
-    valid['iopv_reason'] = signals[9]
-    valid['arb_path'] = signals[10]
-    valid['arb_path_desc'] = signals[11]
-    valid['settlement_days'] = signals[12]
-    valid['annualized_return'] = signals[13]
-    valid['capital_efficiency'] = signals[14]
-    valid['risk_notes'] = signals[15]
-    valid['daily_limit'] = signals[16]
-    
-    # 构建结果
-    results = []
-    for _, row in valid.iterrows():
-        results.append({
-            'code': row['code'],
-            'name': row['name'],
-            'price': round(row['price'], 4),
-            'est_nav': round(row['est_nav'], 4),
-            'prev_nav': round(row['prev_nav'], 4) if pd.notna(row['prev_nav']) else None,
-            'realtime_discount': round(row['realtime_discount'], 2),
-            't1_discount': round(row['t1_discount'], 2) if pd.notna(row['t1_discount']) else None,
-            'est_change_pct': round(row['est_change_pct'], 2) if pd.notna(row['est_change_pct']) else None,
-            'change_pct': round(row['change_pct'], 2) if pd.notna(row['change_pct']) else None,
-            'volume': int(row['volume']) if pd.notna(row['volume']) else 0,
-            'amount': round(row['amount'] / 10000, 2) if pd.notna(row['amount']) else 0,
-            'turnover_rate': round(row['turnover_rate'], 2) if pd.notna(row['turnover_rate']) else None,
-            'signal_type': row['signal_type'],
-            'signal_strength': row['signal_strength'],
-            'fund_type': row['fund_type'],
-            'threshold': row['threshold'],
-            'can_subscribe': row['can_subscribe'],
-            'subscribe_status': row['subscribe_status'],
-            'redeem_status': row['redeem_status'],
-            'low_liquidity': row['low_liquidity'],
-            'daily_limit': float(row['daily_limit']) if pd.notna(row['daily_limit']) else None,  # 限额（元）
-            # 其他字段
-            'iopv_reliability': row['iopv_reliability'],
-            'iopv_reason': row['iopv_reason'],
-            'arb_path': row['arb_path'],
-            'arb_path_desc': row['arb_path_desc'],
-            'settlement_days': row['settlement_days'],
-            'annualized_return': row['annualized_return'],
-            'capital_efficiency': row['capital_efficiency'],
-            'risk_notes': row['risk_notes'],
-        })
+    # 判断套利信号（基于实时折溢价，使用分类阈值），整列向量化计算
+    discount = valid['realtime_discount']
+    est_change = valid['est_change_pct'].fillna(0)
+    
+    # 基金类型、阈值和结算天数：每个名称只识别一次，再按列拼接
+    fund_types = {name: classify_fund(name) for name in valid['name'].unique()}
+    valid = valid.join(
+        pd.DataFrame.from_dict(fund_types, orient='index', columns=['fund_type', 'threshold', 'settlement_days']),
+        on='name',
+    )
+    
+    # 申购状态（未查到状态默认可申购）
+    status_df = pd.DataFrame.from_dict(
+        subscribe_status, orient='index',
+        columns=['subscribe_status', 'redeem_status', 'can_subscribe', 'daily_limit'],
+    )
+    valid = valid.join(status_df, on='code')
+    valid['subscribe_status'] = valid['subscribe_status'].fillna('未知')
+    valid['redeem_status'] = valid['redeem_status'].fillna('未知')
+    valid['can_subscribe'] = valid['can_subscribe'].fillna(True).astype(bool)
+    
+    # 流动性判断：成交额 < 500万 = 流动性不足
+    low_liquidity = (valid['amount'].fillna(0) / 10000) < MIN_AMOUNT_THRESHOLD
+    
+    # IOPV可信度 / 套利路径 / 资金效率 / 风险提示
+    iopv_reliability, iopv_reason = calculate_iopv_reliability(valid['fund_type'], est_change)
+    arb_path, arb_path_desc = determine_arb_path(discount, valid['threshold'], valid['can_subscribe'])
+    annualized_return, capital_efficiency = calculate_capital_efficiency(discount, valid['settlement_days'])
+    risk_notes = generate_risk_notes(est_change, valid['settlement_days'])
+    
+    # 溢价超过该类型阈值才算套利机会，信号强度 = 超过阈值的倍数
+    threshold = valid['threshold']
+    is_signal = discount >= threshold
+    strength = np.where(is_signal, np.minimum((discount - threshold) / threshold * 100, 100), 0.0)
+    
+    # 构建结果（整列转列表后按行拼装，字段顺序与取整方式保持不变）
+    columns = {
+        'code': valid['code'].tolist(),
+        'name': valid['name'].tolist(),
+        'price': _round_list(valid['price'], 4),
+        'est_nav': _round_list(valid['est_nav'], 4),
+        'prev_nav': _round_list(valid['prev_nav'].astype(float), 4),
+        'realtime_discount': _round_list(discount, 2),
+        't1_discount': _round_list(valid['t1_discount'].astype(float), 2),
+        'est_change_pct': _round_list(valid['est_change_pct'], 2),
+        'change_pct': _round_list(valid['change_pct'], 2),
+        'volume': [int(v) if v == v else 0 for v in valid['volume'].tolist()],
+        'amount': _round_list(valid['amount'] / 10000, 2, default=0),
+        'turnover_rate': _round_list(valid['turnover_rate'], 2),
+        'signal_type': ["溢价套利" if flag else None for flag in is_signal.tolist()],
+        'signal_strength': [round(v, 1) for v in strength.tolist()],
+        'fund_type': valid['fund_type'].tolist(),
+        'threshold': threshold.tolist(),
+        'can_subscribe': valid['can_subscribe'].tolist(),
+        'subscribe_status': valid['subscribe_status'].tolist(),
+        'redeem_status': valid['redeem_status'].tolist(),
+        'low_liquidity': low_liquidity.tolist(),
+        'daily_limit': [float(v) if pd.notna(v) else None for v in valid['daily_limit'].tolist()],  # 限额（元）
+        # 其他字段
+        'iopv_reliability': iopv_reliability.tolist(),
+        'iopv_reason': iopv_reason.tolist(),
+        'arb_path': arb_path.tolist(),
+        'arb_path_desc': arb_path_desc.tolist(),
+        'settlement_days': valid['settlement_days'].tolist(),
+        'annualized_return': [round(v, 1) for v in annualized_return.tolist()],
+        'capital_efficiency': [round(v, 0) for v in capital_efficiency.tolist()],
+        'risk_notes': risk_notes,
+    }
+    keys = list(columns)
+    results = [dict(zip(keys, row)) for row in zip(*columns.values())]
     
     print(f"✅ 计算完成，有效数据 {len(results)} 只")
     return results
 
 
-def get_fund_nav_history(fund_code, days=60, cache=None):
-    """获取基金历史净值（带缓存）"""
+# ==========================================
+# 🚦 并发获取与限速
+# ==========================================
+# 热门LOF历史数据并发线程数：可通过环境变量 LOF_FETCH_WORKERS 调整，1 即串行
+HOT_FETCH_WORKERS = int(os.environ.get('LOF_FETCH_WORKERS', '6'))
+
+# 按上游主机的令牌桶：(每秒补充令牌数, 桶容量)，同主机的所有线程共享一个桶
+NAV_HISTORY_HOST = 'fund.eastmoney.com'        # fund_open_fund_info_em
+PRICE_HISTORY_HOST = 'push2his.eastmoney.com'  # fund_lof_hist_em
+HOST_RATE_LIMITS = {
+    NAV_HISTORY_HOST: (5.0, 3),
+    PRICE_HISTORY_HOST: (5.0, 3),
+}
+DEFAULT_RATE_LIMIT = (3.0, 1)
+
+# 失败重试：最多重试次数，首次退避秒数（之后指数翻倍并加随机抖动）
+FETCH_RETRIES = 2
+FETCH_BACKOFF = 0.5
+
+
+_print_lock = threading.Lock()
+
+def log(msg):
+    """线程安全输出，避免并发获取时多行日志交错"""
+    with _print_lock:
+        print(msg, flush=True)
+
+
+class TokenBucket:
+    """令牌桶：平均速率 rate 次/秒，允许 capacity 次突发"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """阻塞到拿到一个令牌为止"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class HostRateLimiter:
+    """按上游主机限速：不同主机各用一个令牌桶，互不阻塞"""
+
+    def __init__(self, limits, default_limit=DEFAULT_RATE_LIMIT):
+        self.limits = limits
+        self.default_limit = default_limit
+        self._buckets = {}
+        self._guard = threading.Lock()
+
+    def acquire(self, host):
+        with self._guard:
+            if host not in self._buckets:
+                self._buckets[host] = TokenBucket(*self.limits.get(host, self.default_limit))
+            bucket = self._buckets[host]
+        bucket.acquire()
+
+
+# 进程级共享，常驻模式下跨轮次保持令牌状态
+RATE_LIMITER = HostRateLimiter(HOST_RATE_LIMITS)
+
+
+class FetchStats:
+    """记录每次请求的耗时（不含限速排队）与重试次数，线程安全"""
+
+    def __init__(self):
+        self.calls = []  # (标签, 耗时秒, 尝试次数, 是否成功)
+        self._lock = threading.Lock()
+
+    def record(self, label, latency, attempts, ok):
+        with self._lock:
+            self.calls.append((label, latency, attempts, ok))
+
+    def summary(self, wall):
+        if not self.calls:
+            return "无请求"
+        latencies = np.array([c[1] for c in self.calls])
+        p50, p90 = np.percentile(latencies, [50, 90])
+        slowest = max(self.calls, key=lambda c: c[1])
+        retries = sum(c[2] - 1 for c in self.calls)
+        failed = sum(1 for c in self.calls if not c[3])
+        return (f"请求 {len(self.calls)} 次, 墙钟 {wall:.2f}s (单次耗时合计 {latencies.sum():.2f}s), "
+                f"p50 {p50:.2f}s / p90 {p90:.2f}s / 最慢 {slowest[0]} {slowest[1]:.2f}s, "
+                f"重试 {retries} 次, 失败 {failed} 次")
+
+
+def call_with_retry(host, label, func, stats=None, **kwargs):
+    """经主机令牌桶限速调用 func，失败按指数退避重试，最终失败时抛出最后一次异常"""
+    for attempt in range(1, FETCH_RETRIES + 2):
+        RATE_LIMITER.acquire(host)
+        start = time.perf_counter()
+        try:
+            result = func(**kwargs)
+        except Exception as e:
+            latency = time.perf_counter() - start
+            if attempt > FETCH_RETRIES:
+                if stats is not None:
+                    stats.record(label, latency, attempt, False)
+                raise
+            backoff = FETCH_BACKOFF * 2 ** (attempt - 1) * random.uniform(1, 1.5)
+            log(f"    ⚠️ {label} 第{attempt}次失败({e})，{backoff:.1f}s 后重试")
+            time.sleep(backoff)
+            continue
+        if stats is not None:
+            stats.record(label, time.perf_counter() - start, attempt, True)
+        return result
+
+
+def get_fund_nav_history(fund_code, days=60, cache=None, stats=None):
+    """获取基金历史净值（带缓存），请求失败返回 None（区别于无数据的 []）"""
     # 如果有缓存且数据足够新，直接返回
     if cache and fund_code in cache:
         cached_data = cache[fund_code]
@@ -675,7 +1223,8 @@ def get_fund_nav_history(fund_code, days=60, cache=None):
             return cached_data
     
     try:
-        df = ak.fund_open_fund_info_em(symbol=fund_code, indicator="单位净值走势")
+        df = call_with_retry(NAV_HISTORY_HOST, f"{fund_code}净值", ak.fund_open_fund_info_em, stats=stats,
+                             symbol=fund_code, indicator="单位净值走势")
         if df is not None and not df.empty:
             df = df.tail(days)
             result = [
@@ -684,12 +1233,12 @@ def get_fund_nav_history(fund_code, days=60, cache=None):
             ]
             return result
     except:
-        pass
+        return None
     return []
 
 
-def get_fund_price_history(fund_code, days=60, cache=None):
-    """获取LOF基金历史价格（带缓存）"""
+def get_fund_price_history(fund_code, days=60, cache=None, start_date=None, stats=None):
+    """获取LOF基金历史价格（带缓存），start_date（YYYY-MM-DD）给定时只拉取该日及之后的数据，请求失败返回 None"""
     # 如果有缓存且数据足够新，直接返回
     if cache and fund_code in cache:
         cached_data = cache[fund_code]
@@ -697,7 +1246,10 @@ def get_fund_price_history(fund_code, days=60, cache=None):
             return cached_data
     
     try:
-        df = ak.fund_lof_hist_em(symbol=fund_code, period="daily", adjust="")
+        kwargs = {'symbol': fund_code, 'period': "daily", 'adjust': ""}
+        if start_date:
+            kwargs.update(start_date=start_date.replace('-', ''), end_date="20500101")
+        df = call_with_retry(PRICE_HISTORY_HOST, f"{fund_code}价格", ak.fund_lof_hist_em, stats=stats, **kwargs)
         if df is not None and not df.empty:
             df = df.tail(days)
             result = [
@@ -710,100 +1262,238 @@ def get_fund_price_history(fund_code, days=60, cache=None):
             ]
             return result
     except:
-        pass
+        return None
     return []
 
 
-def get_hot_lof_details(all_funds):
-    """获取热门LOF基金详情（带智能缓存）"""
-    print("\n📈 获取热门LOF基金历史数据...")
-    
-    hot_codes = {code for code, _, _ in HOT_LOF_LIST}
-    hot_map = {code: (name, track) for code, name, track in HOT_LOF_LIST}
+def refresh_fund_history(code, price_dates, nav_mark, nav_point, stats=None):
+    """
+    增量拉取单只基金的历史数据，返回 (新价格行, 新净值行, API调用次数, 是否全部请求成功)
+    price_dates 为面板中已有价格的日期（升序），nav_mark 为已有净值的最后日期
+    - 价格：从最后一天（水位线）的次日开始拉取，已覆盖到最新净值日期时不请求；未收盘的当日K线不入面板
+    - 净值：当天净值缓存已给出最新净值及日期，只缺这一天时直接追加；新基金或缺口超过一天才整段拉取
+    """
+    api_calls = 0
+    today = get_today_str()
+    latest_nav_date = nav_point[0] if nav_point else None
+    price_rows, nav_rows = [], []
+    complete = True
+    
+    price_mark = price_dates[-1] if price_dates else None
+    if price_mark is None or latest_nav_date is None or price_mark < latest_nav_date:
+        start = (date.fromisoformat(price_mark) + timedelta(days=1)).isoformat() if price_mark else None
+        price_rows = get_fund_price_history(code, days=HISTORY_DAYS, start_date=start, stats=stats)
+        api_calls += 1
+        if price_rows is None:
+            price_rows, complete = [], False
+        if datetime.now().hour < 15:
+            price_rows = [row for row in price_rows if row['date'] < today]
+        price_dates = price_dates + [row['date'] for row in price_rows]
+    
+    if nav_mark is not None and latest_nav_date is not None and latest_nav_date <= nav_mark:
+        return price_rows, nav_rows, api_calls, complete
+    
+    gap = [d for d in price_dates if nav_mark < d < latest_nav_date] if nav_mark and latest_nav_date else None
+    if gap == []:
+        nav_rows = [{'date': latest_nav_date, 'nav': nav_point[1]}]
+    else:
+        nav_rows = get_fund_nav_history(code, days=HISTORY_DAYS, stats=stats)
+        api_calls += 1
+        if nav_rows is None:
+            nav_rows, complete = [], False
+    return price_rows, nav_rows, api_calls, complete
+
+
+# ==========================================
+# 🗃️ 全市场历史面板
+# ==========================================
+# 全部场内LOF最近 HISTORY_DAYS 个交易日的收盘价/成交量/单位净值，按 (基金, 日期) 对齐为二维数组
+# 缺失值为 NaN；'checked' 记录每只基金最近一次增量检查的日期，每只基金每天最多检查一次
+HISTORY_PANEL_FILE = os.path.join(CACHE_DIR, "history_panel.npz")
+HISTORY_PANEL_FIELDS = ('close', 'volume', 'nav')
+HISTORY_BUDGET_RATIO = 0.5  # 常驻模式下每轮历史刷新最多占用刷新间隔的比例，没轮到的基金下一轮继续
+
+# 进程内缓存，常驻模式下跨轮次复用
+_HISTORY_PANEL = {}
+
+
+def merge_history_panel(panel, new_rows, universe, checked):
+    """
+    把长表形式的新数据（code/date/close/volume/nav 列）合并进面板，同一格以新数据为准
+    行对齐到 universe（移除已不在场内的基金），列取全部日期的并集并只保留最近 HISTORY_DAYS 个
+    """
+    frames = {}
+    for field in HISTORY_PANEL_FIELDS:
+        old = pd.DataFrame(panel[field], index=panel['codes'], columns=panel['dates'])
+        rows = new_rows.dropna(subset=[field]).drop_duplicates(['code', 'date'], keep='last') if field in new_rows else None
+        if rows is None or rows.empty:
+            frames[field] = old
+        else:
+            frames[field] = rows.pivot(index='code', columns='date', values=field).combine_first(old)
     
-    # 加载历史缓存
-    nav_history_cache = load_cache(NAV_HISTORY_CACHE_FILE)
-    price_history_cache = load_cache(PRICE_HISTORY_CACHE_FILE)
+    dates = sorted(set().union(*(frame.columns for frame in frames.values())))[-HISTORY_DAYS:]
+    merged = {
+        field: frame.reindex(index=universe, columns=dates).to_numpy(dtype=np.float64)
+        for field, frame in frames.items()
+    }
+    merged['codes'] = np.array(universe, dtype=str)
+    merged['dates'] = np.array(dates, dtype=str)
+    merged['checked'] = np.array([checked.get(code, '') for code in universe], dtype=str)
+    return merged
+
+
+def empty_history_panel():
+    panel = {field: np.empty((0, 0)) for field in HISTORY_PANEL_FIELDS}
+    panel.update(codes=np.array([], dtype=str), dates=np.array([], dtype=str), checked=np.array([], dtype=str))
+    return panel
+
+
+def load_history_panel():
+    """加载历史面板；面板文件不存在时用旧版按基金保存的 JSON 历史缓存初始化"""
+    if _HISTORY_PANEL:
+        return _HISTORY_PANEL['panel']
     
+    if os.path.exists(HISTORY_PANEL_FILE):
+        panel = _load_npz(HISTORY_PANEL_FILE)
+    else:
+        panel = empty_history_panel()
+        nav_cache = load_cache(NAV_HISTORY_CACHE_FILE)
+        price_cache = load_cache(PRICE_HISTORY_CACHE_FILE)
+        checked = nav_cache.get('_checked', {})
+        rows = [
+            {'code': code, **row}
+            for cache in (price_cache, nav_cache)
+            for code, history in cache.items() if not code.startswith('_') and isinstance(history, list)
+            for row in history
+        ]
+        if rows:
+            codes = sorted({row['code'] for row in rows})
+            panel = merge_history_panel(panel, pd.DataFrame(rows), codes, checked)
+            print(f"  📦 已从旧版历史缓存导入 {len(codes)} 只基金")
+    
+    _HISTORY_PANEL['panel'] = panel
+    return panel
+
+
+def save_history_panel(panel):
+    _HISTORY_PANEL['panel'] = panel
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    _write_npz(HISTORY_PANEL_FILE, panel)
+
+
+def refresh_history_panel(codes, priority=(), budget=None):
+    """
+    增量刷新全部场内LOF的历史面板并返回面板
+    当天尚未检查的基金按水位线增量补齐（线程池并发、按主机令牌桶限速），priority 中的基金优先，其余按上次检查日期从早到晚；
+    请求失败的基金已取到的数据照常合并，但不记为已检查，下一轮重试；
+    budget（秒）给定时超时后不再发起新的基金刷新，剩下的留到下一轮
+    """
+    print("\n📈 增量刷新全市场LOF历史面板...")
+    panel = load_history_panel()
+    universe = list(dict.fromkeys(codes))
     today = get_today_str()
+    checked = dict(zip(panel['codes'].tolist(), panel['checked'].tolist()))
     
-    # 检查缓存是否需要更新
-    # 条件1: 日期变化（每天更新一次）
-    # 条件2: 基金列表变化（code变化时更新）
-    current_codes_hash = get_codes_hash(list(hot_codes))
-    cache_date = nav_history_cache.get('_date', '')
-    cache_hash = nav_history_cache.get('_codes_hash', '')
+    rank = {code: i for i, code in enumerate(priority)}
+    pending = [code for code in universe if checked.get(code) != today]
+    pending.sort(key=lambda code: (code not in rank, rank.get(code, 0), checked.get(code, '')))
     
-    need_full_refresh = (cache_date != today) or (cache_hash != current_codes_hash)
+    api_calls = 0
+    refreshed = 0
+    failed = 0
+    new_rows = []
+    if pending:
+        nav_cache = load_nav_cache()
+        index = {code: i for i, code in enumerate(panel['codes'].tolist())}
+        stats = FetchStats()
+        wall_start = time.perf_counter()
+        deadline = time.monotonic() + budget if budget else None
+        
+        def refresh(code):
+            if deadline is not None and time.monotonic() > deadline:
+                return None
+            i = index.get(code)
+            price_dates, nav_mark = [], None
+            if i is not None:
+                price_dates = panel['dates'][~np.isnan(panel['close'][i])].tolist()
+                nav_dates = panel['dates'][~np.isnan(panel['nav'][i])]
+                nav_mark = str(nav_dates[-1]) if len(nav_dates) else None
+            return refresh_fund_history(code, price_dates, nav_mark, get_cached_nav_point(nav_cache, code), stats=stats)
+        
+        with ThreadPoolExecutor(max_workers=max(1, HOT_FETCH_WORKERS)) as executor:
+            futures = {executor.submit(refresh, code): code for code in pending}
+            for future in as_completed(futures):
+                result = future.result()
+                if result is None:
+                    continue
+                code = futures[future]
+                price_rows, nav_rows, calls, complete = result
+                new_rows.extend({'code': code, **row} for row in price_rows + nav_rows)
+                api_calls += calls
+                if complete:
+                    checked[code] = today
+                    refreshed += 1
+                else:
+                    failed += 1
+        
+        log(f"  ⏱️ 历史数据{stats.summary(time.perf_counter() - wall_start)}")
     
-    if need_full_refresh:
-        print(f"  📡 缓存需要更新 (日期:{cache_date != today}, 代码变化:{cache_hash != current_codes_hash})")
-        nav_history_cache = {'_date': today, '_codes_hash': current_codes_hash}
-        price_history_cache = {'_date': today, '_codes_hash': current_codes_hash}
-    else:
-        print(f"  ✅ 使用今日缓存数据")
+    removed = len(set(checked) - set(universe))
+    if new_rows or refreshed or removed or len(panel['codes']) != len(universe):
+        new_rows = pd.DataFrame(new_rows, columns=['code', 'date', *HISTORY_PANEL_FIELDS])
+        panel = merge_history_panel(panel, new_rows, universe, checked)
+        save_history_panel(panel)
     
-    hot_details = []
-    api_calls = 0
-    cache_hits = 0
+    print(f"✅ 历史面板: {len(panel['codes'])} 只基金 × {len(panel['dates'])} 个交易日 "
+          f"(本轮检查:{refreshed}只, 失败:{failed}只, API调用:{api_calls}, 待下轮:{len(pending) - refreshed}只, 移除:{removed}只)")
+    return panel
+
+
+def compute_discount_panel(panel):
+    """按日期对齐的价格/净值矩阵一次算出全部基金的历史折溢价率（%），价格或净值缺失、净值非正时为 NaN"""
+    nav = panel['nav']
+    with np.errstate(divide='ignore', invalid='ignore'):
+        discount = np.where(nav > 0, (panel['close'] - nav) / nav * 100, np.nan)
+    return np.round(discount, 2)
+
+
+def get_hot_lof_details(all_funds, panel):
+    """从历史面板取热门LOF基金详情：最近30个交易日的价格和折溢价率"""
+    hot_map = {code: (name, track) for code, name, track in HOT_LOF_LIST}
+    index = {code: i for i, code in enumerate(panel['codes'].tolist())}
+    discount = compute_discount_panel(panel)
+    dates = panel['dates']
     
+    hot_details = []
     for fund in all_funds:
         code = fund['code']
-        if code not in hot_codes:
+        if code not in hot_map:
             continue
         
-        name, track_index = hot_map.get(code, (fund['name'], ''))
-        
-        # 获取历史数据（优先使用缓存）
-        if code in nav_history_cache and not need_full_refresh:
-            nav_history = nav_history_cache[code]
-            cache_hits += 1
-        else:
-            print(f"  📡 获取 {code} {name} 历史净值...")
-            nav_history = get_fund_nav_history(code, days=60)
-            nav_history_cache[code] = nav_history
-            api_calls += 1
-            time.sleep(0.15)
-        
-        if code in price_history_cache and not need_full_refresh:
-            price_history = price_history_cache[code]
-            cache_hits += 1
-        else:
-            print(f"  📡 获取 {code} {name} 历史价格...")
-            price_history = get_fund_price_history(code, days=60)
-            price_history_cache[code] = price_history
-            api_calls += 1
-            time.sleep(0.15)
-        
-        # 计算历史折溢价率
-        discount_history = []
-        if price_history and nav_history:
-            nav_dict = {item['date']: item['nav'] for item in nav_history}
-            for price_item in price_history:
-                date_str = price_item['date']
-                if date_str in nav_dict and nav_dict[date_str] > 0:
-                    discount = (price_item['close'] - nav_dict[date_str]) / nav_dict[date_str] * 100
-                    discount_history.append({
-                        'date': date_str,
-                        'price': price_item['close'],
-                        'nav': nav_dict[date_str],
-                        'discount_rate': round(discount, 2)
-                    })
+        price_history, discount_history = [], []
+        i = index.get(code)
+        if i is not None:
+            has_price = ~np.isnan(panel['close'][i])
+            price_history = [
+                {'date': d, 'close': close, 'volume': int(volume)}
+                for d, close, volume in zip(dates[has_price][-30:].tolist(), panel['close'][i][has_price][-30:].tolist(),
+                                            panel['volume'][i][has_price][-30:].tolist())
+            ]
+            has_discount = ~np.isnan(discount[i])
+            discount_history = [
+                {'date': d, 'price': price, 'nav': nav, 'discount_rate': rate}
+                for d, price, nav, rate in zip(*(values[has_discount][-30:].tolist() for values in (
+                    dates, panel['close'][i], panel['nav'][i], discount[i])))
+            ]
         
         hot_details.append({
             **fund,
-            'track_index': track_index,
-            'price_history': price_history[-30:],
-            'discount_history': discount_history[-30:],
+            'track_index': hot_map[code][1],
+            'price_history': price_history,
+            'discount_history': discount_history,
         })
     
-    # 保存缓存
-    if api_calls > 0:
-        save_cache(NAV_HISTORY_CACHE_FILE, nav_history_cache)
-        save_cache(PRICE_HISTORY_CACHE_FILE, price_history_cache)
-        print(f"  💾 缓存已更新")
-    
-    print(f"✅ 获取到 {len(hot_details)} 只热门LOF详情 (API调用:{api_calls}, 缓存命中:{cache_hits})")
+    print(f"✅ 获取到 {len(hot_details)} 只热门LOF详情")
     return hot_details
 
 
@@ -817,46 +1507,65 @@ def get_arbitrage_opportunities(signals, top_n=20):
     }
 
 
+# 市场概览分布区间：边界（%）与区间名一一对应（名称数 = 边界数 + 1）
+# 恰好落在边界上的值归入离 0 更远的区间：-3 算深度折价，-1 算轻度折价，1 算轻度溢价，3 算深度溢价
+OVERVIEW_BUCKET_EDGES = [-3, -1, 1, 3]
+OVERVIEW_BUCKET_NAMES = ['deep_discount', 'slight_discount', 'fair_value', 'slight_premium', 'deep_premium']
+OVERVIEW_PERCENTILES = [5, 25, 50, 75, 95]
+
+
 def get_market_overview(signals):
-    """获取市场概览"""
-    if not signals:
-        return {
-            'total_count': 0,
-            'avg_discount_rate': 0,
-            'max_discount': 0,
-            'max_premium': 0,
-            'distribution': {
-                'deep_discount': 0, 'slight_discount': 0, 'fair_value': 0,
-                'slight_premium': 0, 'deep_premium': 0,
-            }
-        }
-    
-    rates = [s['realtime_discount'] for s in signals if s['realtime_discount'] is not None]
+    """
+    获取市场概览：整体统计、分布区间、分位数和按基金类型分组统计
+    折溢价率数组只做一次区间划分（np.digitize），分组统计复用同一组区间编号
+    """
+    names = OVERVIEW_BUCKET_NAMES
+    rates = np.array([s['realtime_discount'] for s in signals if s['realtime_discount'] is not None], dtype=float)
+    fund_types = [s['fund_type'] for s in signals if s['realtime_discount'] is not None]
     
-    if not rates:
+    if not len(rates):
         return {
             'total_count': len(signals),
             'avg_discount_rate': 0,
             'max_discount': 0,
             'max_premium': 0,
-            'distribution': {
-                'deep_discount': 0, 'slight_discount': 0, 'fair_value': 0,
-                'slight_premium': 0, 'deep_premium': 0,
-            }
+            'distribution': dict.fromkeys(names, 0),
+            'histogram': {'edges': OVERVIEW_BUCKET_EDGES, 'counts': [0] * len(names)},
+            'percentiles': {},
+            'by_type': {},
         }
     
+    # 负数按右闭区间、非负数按左闭区间划分，使边界值归入离 0 更远的一侧（与原先的 <= -3 / >= 3 判断一致）
+    edges = np.asarray(OVERVIEW_BUCKET_EDGES, dtype=float)
+    bucket = np.where(rates < 0, np.digitize(rates, edges, right=True), np.digitize(rates, edges))
+    counts = np.bincount(bucket, minlength=len(names))
+    
+    frame = pd.DataFrame({'fund_type': fund_types, 'rate': rates, 'bucket': bucket})
+    grouped = frame.groupby('fund_type', sort=False)
+    stats = grouped['rate'].agg(['count', 'mean', 'median', 'min', 'max'])
+    type_counts = pd.crosstab(frame['fund_type'], frame['bucket']).reindex(columns=range(len(names)), fill_value=0)
+    
+    by_type = {
+        fund_type: {
+            'count': int(row['count']),
+            'avg_discount_rate': round(float(row['mean']), 2),
+            'median_discount_rate': round(float(row['median']), 2),
+            'max_discount': round(float(row['min']), 2),
+            'max_premium': round(float(row['max']), 2),
+            'distribution': dict(zip(names, type_counts.loc[fund_type].tolist())),
+        }
+        for fund_type, row in stats.sort_values('count', ascending=False).iterrows()
+    }
+    
     return {
         'total_count': len(signals),
-        'avg_discount_rate': round(sum(rates) / len(rates), 2),
-        'max_discount': round(min(rates), 2),
-        'max_premium': round(max(rates), 2),
-        'distribution': {
-            'deep_discount': len([r for r in rates if r <= -3]),
-            'slight_discount': len([r for r in rates if -3 < r <= -1]),
-            'fair_value': len([r for r in rates if -1 < r < 1]),
-            'slight_premium': len([r for r in rates if 1 <= r < 3]),
-            'deep_premium': len([r for r in rates if r >= 3]),
-        }
+        'avg_discount_rate': round(float(rates.mean()), 2),
+        'max_discount': round(float(rates.min()), 2),
+        'max_premium': round(float(rates.max()), 2),
+        'distribution': dict(zip(names, counts.tolist())),
+        'histogram': {'edges': OVERVIEW_BUCKET_EDGES, 'counts': counts.tolist()},
+        'percentiles': {f"p{q}": round(float(v), 2) for q, v in zip(OVERVIEW_PERCENTILES, np.percentile(rates, OVERVIEW_PERCENTILES))},
+        'by_type': by_type,
     }
 
 
@@ -871,36 +1580,488 @@ export const LOF_DATA = {json.dumps(data, ensure_ascii=False, indent=2)};
 export default LOF_DATA;
 """
     
-    with open(OUTPUT_PATH, "w", encoding="utf-8") as f:
-        f.write(ts_content)
+    # 先写临时文件再原子替换，前端/推送脚本任何时刻读到的都是完整文件
+    _write_ts(OUTPUT_PATH, ts_content)
     
     print(f"\n✅ 数据已保存到: {OUTPUT_PATH}")
 
 
-def main():
-    print("=" * 60)
-    print("🚀 LOF基金套利监测数据获取")
-    print("📌 核心改进：使用盘中实时估值计算真实套利折溢价")
-    print("📌 新增：申购状态判断（套利生死线！）")
-    print("=" * 60)
+# ==========================================
+# 🧩 增量输出（--delta）
+# ==========================================
+# lof_data.ts 作为完整快照（meta.snapshot_id 标识），lof_patch.ts 只放相对快照变化超过容差的基金
+# 补丁是累积的（始终相对当前快照），前端只需应用最新一个；变化过多或跨日时重写完整快照
+PATCH_FILENAME = "lof_patch.ts"
+PATCH_PATH = os.path.join(DATA_DIR, PATCH_FILENAME)
+DELTA_PRICE_TOLERANCE = 0.002     # 场内价格/实时估值的相对变化
+DELTA_DISCOUNT_TOLERANCE = 0.1    # 实时折溢价率的变化（百分点）
+DELTA_STATUS_FIELDS = ('signal_type', 'can_subscribe', 'subscribe_status', 'redeem_status',
+                       'low_liquidity', 'arb_path', 'iopv_reliability')
+DELTA_REBASE_RATIO = 0.3          # 变化基金占比超过该值时重写完整快照
+
+# 当前快照（常驻模式下保存在内存，单次运行时从 lof_data.ts 读取）
+_DELTA_BASE = {}
+
+
+def _write_ts(path, content):
+    """先写临时文件再原子替换"""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+
+def fund_changed(current, base):
+    """基金相对快照是否变化：价格/估值超过相对容差、折溢价率超过绝对容差，或状态类字段变化"""
+    for field in ('price', 'est_nav'):
+        new, old = current.get(field), base.get(field)
+        if (new is None) != (old is None):
+            return True
+        if new is not None and abs(new - old) > abs(old) * DELTA_PRICE_TOLERANCE:
+            return True
+    new, old = current.get('realtime_discount'), base.get('realtime_discount')
+    if (new is None) != (old is None) or (new is not None and abs(new - old) > DELTA_DISCOUNT_TOLERANCE):
+        return True
+    return any(current.get(field) != base.get(field) for field in DELTA_STATUS_FIELDS)
+
+
+def load_delta_base():
+    """读取当前快照（优先内存），返回 {'id', 'funds', 'hot', 'seq'}；没有带 snapshot_id 的快照时返回 None"""
+    if _DELTA_BASE:
+        return _DELTA_BASE
+    try:
+        with open(OUTPUT_PATH, 'r', encoding='utf-8') as f:
+            match = re.search(r'export const LOF_DATA = ({.*?});\n', f.read(), re.S)
+        base = json.loads(match.group(1))
+    except Exception:
+        return None
+    snapshot_id = base['meta'].get('snapshot_id')
+    if not snapshot_id:
+        return None
+    # 接着上一个补丁的序号继续编号
+    seq = 0
+    try:
+        with open(PATCH_PATH, 'r', encoding='utf-8') as f:
+            patch = json.loads(re.search(r'export const LOF_PATCH = ({.*?});\n', f.read(), re.S).group(1))
+        if patch.get('base') == snapshot_id:
+            seq = patch.get('seq', 0)
+    except Exception:
+        pass
+    _DELTA_BASE.update({
+        'id': snapshot_id,
+        'funds': {f['code']: f for f in base['all_funds']},
+        'hot': {f['code']: f for f in base['hot_funds']},
+        'seq': seq,
+    })
+    return _DELTA_BASE
+
+
+def generate_delta_files(data):
+    """增量输出：变化少时只写 lof_patch.ts，否则重写完整快照 lof_data.ts 并清空补丁"""
+    base = load_delta_base()
+    updated_at = data['meta']['updated_at']
+    
+    changed, removed, hot_changed = [], [], []
+    rebase = base is None or base['id'][:10] != updated_at[:10]
+    if not rebase:
+        funds = base['funds']
+        changed = [f for f in data['all_funds'] if f['code'] not in funds or fund_changed(f, funds[f['code']])]
+        current_codes = {f['code'] for f in data['all_funds']}
+        removed = [code for code in funds if code not in current_codes]
+        hot_changed = [f for f in data['hot_funds'] if f['code'] not in base['hot'] or fund_changed(f, base['hot'][f['code']])]
+        rebase = len(changed) + len(removed) > len(data['all_funds']) * DELTA_REBASE_RATIO
+    
+    if rebase:
+        data['meta']['snapshot_id'] = updated_at
+        generate_ts_file(data)
+        _DELTA_BASE.clear()
+        _DELTA_BASE.update({
+            'id': updated_at,
+            'funds': {f['code']: f for f in data['all_funds']},
+            'hot': {f['code']: f for f in data['hot_funds']},
+            'seq': 0,
+        })
+        changed, removed, hot_changed = [], [], []
+    else:
+        base['seq'] += 1
+    
+    patch = {
+        'base': _DELTA_BASE['id'],
+        'seq': _DELTA_BASE['seq'],
+        'meta': data['meta'],
+        'overview': data['overview'],
+        'opportunities': data['opportunities'],
+        'all_funds': changed,
+        'removed': removed,
+        'hot_funds': hot_changed,
+    }
+    _write_ts(PATCH_PATH, f"""// LOF基金套利监测增量补丁（相对 lof_data.ts 快照 {patch['base']}）
+// 自动生成于 {updated_at}
+
+export const LOF_PATCH = {json.dumps(patch, ensure_ascii=False)};
+
+export default LOF_PATCH;
+""")
     
-    # 1. 获取实时估值（盘中IOPV）
-    est_df = get_realtime_estimation()
-    if est_df is None:
-        print("❌ 获取实时估值失败，退出")
-        sys.exit(1)
+    if rebase:
+        print(f"✅ 已重写完整快照，补丁已清空: {PATCH_PATH}")
+    else:
+        print(f"\n✅ 增量补丁 #{patch['seq']} 已保存: {PATCH_PATH} "
+              f"(变化 {len(changed)} 只, 移除 {len(removed)} 只, 热门 {len(hot_changed)} 只)")
+
+
+# ==========================================
+# 📼 盘中快照存储
+# ==========================================
+# 每轮更新把全部基金的快照追加为当天目录下的一个压缩列式分块（HHMMSS.npz，只追加不改写）
+# 跨日后把前一天的分块合并为 day.npz，按 (代码, 时间) 排序，按代码查询时二分定位
+# ts 列为本地（北京时间）墙上时钟的秒数，与 pd.Timestamp 的无时区时间直接对应
+SNAPSHOT_DIR = os.path.join(CACHE_DIR, "snapshots")
+SNAPSHOT_FIELDS = ('price', 'est_nav', 'realtime_discount', 'amount')
+SNAPSHOT_DAY_FILE = "day.npz"
+
+
+def _write_npz(path, columns):
+    """压缩写入 npz（先写临时文件再原子替换）"""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        np.savez_compressed(f, **columns)
+    os.replace(tmp_path, path)
+
+
+def _load_npz(path):
+    with np.load(path) as npz:
+        return {key: npz[key] for key in npz.files}
+
+
+def compact_snapshot_days(keep_day=None):
+    """把非当天的分块合并为按 (代码, 时间) 排序的单个 day.npz，并删除分块"""
+    if not os.path.isdir(SNAPSHOT_DIR):
+        return
+    for day in sorted(os.listdir(SNAPSHOT_DIR)):
+        day_dir = os.path.join(SNAPSHOT_DIR, day)
+        chunks = sorted(f for f in os.listdir(day_dir) if f.endswith('.npz') and f != SNAPSHOT_DAY_FILE)
+        if day == keep_day or not chunks:
+            continue
+        parts = [_load_npz(os.path.join(day_dir, f)) for f in chunks]
+        day_path = os.path.join(day_dir, SNAPSHOT_DAY_FILE)
+        if os.path.exists(day_path):
+            parts.insert(0, _load_npz(day_path))
+        merged = {key: np.concatenate([part[key] for part in parts]) for key in parts[0]}
+        order = np.lexsort((merged['ts'], merged['code']))
+        _write_npz(day_path, {key: values[order] for key, values in merged.items()})
+        for f in chunks:
+            os.remove(os.path.join(day_dir, f))
+        print(f"  🗜️ 快照 {day} 已合并 ({len(chunks)} 个分块, {len(order)} 条)")
+
+
+def append_snapshot(all_funds, now=None):
+    """追加本轮全部基金的盘中快照（时间、价格、实时估值、折溢价率、成交额）"""
+    now = now or datetime.now()
+    day = now.strftime('%Y-%m-%d')
+    day_dir = os.path.join(SNAPSHOT_DIR, day)
+    if not os.path.isdir(day_dir):
+        # 当天第一轮：顺带合并之前各天的分块
+        compact_snapshot_days(keep_day=day)
+        os.makedirs(day_dir, exist_ok=True)
+    
+    columns = {
+        'code': np.array([f['code'] for f in all_funds], dtype=str),
+        'ts': np.full(len(all_funds), int(pd.Timestamp(now).timestamp()), dtype=np.int64),
+    }
+    for field in SNAPSHOT_FIELDS:
+        columns[field] = np.array([f[field] for f in all_funds], dtype=np.float64)
+    _write_npz(os.path.join(day_dir, now.strftime('%H%M%S') + '.npz'), columns)
+
+
+def query_snapshots(code=None, start=None, end=None):
+    """
+    按代码和时间范围查询盘中快照，返回按 (代码, 时间) 排序的 DataFrame
+    start/end 为 datetime 或可被 pd.Timestamp 解析的字符串（闭区间），code 为空时返回全部基金
+    """
+    start = pd.Timestamp(start) if start is not None else None
+    end = pd.Timestamp(end) if end is not None else None
+    lo = int(start.timestamp()) if start is not None else None
+    hi = int(end.timestamp()) if end is not None else None
+    
+    parts = []
+    days = sorted(os.listdir(SNAPSHOT_DIR)) if os.path.isdir(SNAPSHOT_DIR) else []
+    for day in days:
+        # 按目录名（日期）和分块名（时分秒）先剪枝，不读不相关的文件
+        if start is not None and day < start.strftime('%Y-%m-%d'):
+            continue
+        if end is not None and day > end.strftime('%Y-%m-%d'):
+            continue
+        day_dir = os.path.join(SNAPSHOT_DIR, day)
+        for name in sorted(os.listdir(day_dir)):
+            if not name.endswith('.npz'):
+                continue
+            if name != SNAPSHOT_DAY_FILE:
+                chunk_time = pd.Timestamp(f"{day} {name[:2]}:{name[2:4]}:{name[4:6]}")
+                if (start is not None and chunk_time < start.floor('s')) or (end is not None and chunk_time > end):
+                    continue
+            block = _load_npz(os.path.join(day_dir, name))
+            if code is not None:
+                if name == SNAPSHOT_DAY_FILE:
+                    left, right = np.searchsorted(block['code'], code, side='left'), np.searchsorted(block['code'], code, side='right')
+                    block = {key: values[left:right] for key, values in block.items()}
+                else:
+                    mask = block['code'] == code
+                    block = {key: values[mask] for key, values in block.items()}
+            mask = np.ones(len(block['ts']), dtype=bool)
+            if lo is not None:
+                mask &= block['ts'] >= lo
+            if hi is not None:
+                mask &= block['ts'] <= hi
+            if mask.any():
+                parts.append({key: values[mask] for key, values in block.items()})
+    
+    columns = ('ts', 'code') + SNAPSHOT_FIELDS
+    if not parts:
+        return pd.DataFrame(columns=list(columns))
+    df = pd.DataFrame({key: np.concatenate([part[key] for part in parts]) for key in columns})
+    df['ts'] = pd.to_datetime(df['ts'], unit='s')
+    return df.sort_values(['code', 'ts'], kind='stable').reset_index(drop=True)
+
+
+# ==========================================
+# 🧪 溢价套利历史回测
+# ==========================================
+# 基于历史面板的日线价格/净值，逐个信号日模拟经典 in_to_out 套利：
+# T日溢价率（收盘价 vs T日净值）≥ 类型阈值 × 缩放系数、且当日成交额 ≥ 下限时，以T日净值场外申购，
+# 份额 T+结算天数 到账后按当日收盘价场内卖出。用T日实际净值代替盘中估值（相当于理想IOPV），
+# 历史申购状态无从获取，视为一直可申购；结算日停牌或超出面板范围的信号不计入成交
+BACKTEST_THRESHOLD_SCALES = (0.5, 0.75, 1.0, 1.5, 2.0)  # 类型阈值缩放系数
+BACKTEST_MIN_AMOUNTS = (0, 100, 500, 1000, 2000)          # 成交额下限（万元），500 即 MIN_AMOUNT_THRESHOLD
+BACKTEST_SUBSCRIBE_FEE = 0.12  # 场外申购费率（%）
+BACKTEST_SELL_FEE = 0.03       # 场内卖出佣金（%）
+BACKTEST_TRADING_DAYS = 250    # 年化用的每年交易日数
+BACKTEST_WORKERS = int(os.environ.get('LOF_BACKTEST_WORKERS', str(min(4, os.cpu_count() or 1))))
+
+# 子进程内的回测数组（进程池初始化时传入一次，各参数组合共用）
+_BACKTEST_ARRAYS = {}
+
+
+def _init_backtest_worker(arrays):
+    _BACKTEST_ARRAYS.update(arrays)
+
+
+def prepare_backtest_arrays(panel, fund_types):
+    """
+    由历史面板一次算出与参数无关的矩阵：T日溢价率、成交额（万元）、T+结算天数卖出的扣费后实际收益率（%）
+    fund_types 为与 panel['codes'] 对齐的 classify_fund 结果列表
+    """
+    close, nav = panel['close'], panel['nav']
+    type_names = sorted({fund_type for fund_type, _, _ in fund_types})
+    type_ids = np.array([type_names.index(fund_type) for fund_type, _, _ in fund_types], dtype=np.int64)
+    threshold = np.array([t for _, t, _ in fund_types], dtype=np.float64)
+    settle = np.array([d for _, _, d in fund_types], dtype=np.int64)
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        premium = np.where(nav > 0, (close - nav) / nav * 100, np.nan)
+        # 成交量单位为手（100份）
+        amount = close * panel['volume'] * 100 / 10000
+        # 卖出日 = 信号日列号 + 结算天数，超出面板的记为 NaN
+        exit_cols = np.arange(close.shape[1])[None, :] + settle[:, None]
+        exit_price = np.take_along_axis(close, np.minimum(exit_cols, close.shape[1] - 1), axis=1)
+        exit_price = np.where(exit_cols < close.shape[1], exit_price, np.nan)
+        cost = nav * (1 + BACKTEST_SUBSCRIBE_FEE / 100)
+        realized = (exit_price * (1 - BACKTEST_SELL_FEE / 100) - cost) / cost * 100
     
-    # 2. 获取LOF场内行情
+    return {
+        'premium': premium, 'amount': amount, 'realized': realized,
+        'threshold': threshold, 'settle': settle, 'type_ids': type_ids, 'type_count': len(type_names),
+    }, type_names
+
+
+def backtest_grid_point(scale, min_amount, arrays=None):
+    """
+    回测一组参数，返回按基金类型汇总的计数/求和（各为长度=类型数的数组）
+    信号 = 溢价率 ≥ 阈值 × scale 且成交额 ≥ min_amount（万元），成交 = 信号中结算日有收盘价的
+    """
+    a = arrays or _BACKTEST_ARRAYS
+    k = a['type_count']
+    signal = (a['premium'] >= a['threshold'][:, None] * scale) & (a['amount'] >= min_amount)
+    traded = signal & ~np.isnan(a['realized'])
+    signal_rows = np.nonzero(signal)[0]
+    trade_rows = np.nonzero(traded)[0]
+    trade_types = a['type_ids'][trade_rows]
+    realized = a['realized'][traded]
+    return scale, min_amount, {
+        'signals': np.bincount(a['type_ids'][signal_rows], minlength=k),
+        'trades': np.bincount(trade_types, minlength=k),
+        'hits': np.bincount(trade_types, weights=realized > 0, minlength=k),
+        'premium_sum': np.bincount(trade_types, weights=a['premium'][traded], minlength=k),
+        'realized_sum': np.bincount(trade_types, weights=realized, minlength=k),
+        'capital_days': np.bincount(trade_types, weights=a['settle'][trade_rows], minlength=k),
+    }
+
+
+def run_backtest(scales=BACKTEST_THRESHOLD_SCALES, min_amounts=BACKTEST_MIN_AMOUNTS, workers=BACKTEST_WORKERS):
+    """
+    在阈值缩放 × 成交额下限的参数网格上回测溢价套利信号（进程池并行），打印并返回按基金类型汇总的 DataFrame
+    列：命中率（扣费后盈利的成交占比）、平均信号溢价、平均实际收益、溢价兑现率（实际收益合计/信号溢价合计）、
+    资金占用期年化收益、每只基金年均周转次数
+    """
+    print("\n🧪 LOF溢价套利历史回测")
     spot_df = get_lof_spot()
     if spot_df is None:
-        print("❌ 获取LOF行情失败，退出")
-        sys.exit(1)
+        print("❌ 获取LOF行情失败")
+        return None
+    panel = refresh_history_panel(spot_df['code'].tolist(), priority=[code for code, _, _ in HOT_LOF_LIST])
+    if not len(panel['codes']) or len(panel['dates']) < 2:
+        print("❌ 历史面板为空，无法回测")
+        return None
+    
+    names = dict(zip(spot_df['code'].tolist(), spot_df['name'].tolist()))
+    fund_types = [classify_fund(names.get(code, '')) for code in panel['codes'].tolist()]
+    arrays, type_names = prepare_backtest_arrays(panel, fund_types)
+    grid = [(scale, min_amount) for scale in scales for min_amount in min_amounts]
+    
+    start = time.perf_counter()
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_backtest_worker, initargs=(arrays,)) as executor:
+            results = list(executor.map(backtest_grid_point, *zip(*grid)))
+    else:
+        results = [backtest_grid_point(scale, min_amount, arrays) for scale, min_amount in grid]
+    elapsed = time.perf_counter() - start
+    
+    fund_counts = np.bincount(arrays['type_ids'], minlength=len(type_names))
+    years = len(panel['dates']) / BACKTEST_TRADING_DAYS
+    rows = []
+    for scale, min_amount, totals in results:
+        frame = pd.DataFrame(totals, index=type_names)
+        frame.insert(0, 'min_amount', min_amount)
+        frame.insert(0, 'scale', scale)
+        frame['funds'] = fund_counts
+        rows.append(frame)
+    df = pd.concat(rows).rename_axis('fund_type').reset_index()
+    
+    trades = df['trades'].where(df['trades'] > 0)
+    df['hit_rate'] = (df['hits'] / trades * 100).round(1)
+    df['avg_premium'] = (df['premium_sum'] / trades).round(2)
+    df['avg_realized'] = (df['realized_sum'] / trades).round(2)
+    df['capture'] = (df['realized_sum'] / df['premium_sum'].where(df['premium_sum'] > 0) * 100).round(1)
+    df['annualized'] = (df['realized_sum'] / df['capital_days'].where(df['capital_days'] > 0) * 365).round(1)
+    df['turnover'] = (df['trades'] / df['funds'] / years).round(1)
+    
+    print(f"  面板 {len(panel['codes'])} 只基金 × {len(panel['dates'])} 个交易日 "
+          f"({panel['dates'][0]} ~ {panel['dates'][-1]})，参数 {len(grid)} 组，{workers} 进程，耗时 {elapsed * 1000:.0f}ms")
+    
+    def print_rows(title, table):
+        print(f"\n{title}")
+        print(f"  {'类型':<8}{'阈值×':>6}{'成交额≥':>8}{'信号':>6}{'成交':>6}{'命中率':>8}{'信号溢价':>9}"
+              f"{'实际收益':>9}{'兑现率':>8}{'年化':>8}{'周转/年':>8}")
+        pct = lambda value: '-' if pd.isna(value) else f"{value}%"  # 无成交的类型显示 -
+        for row in table.itertuples():
+            print(f"  {row.fund_type:<8}{row.scale:>6}{row.min_amount:>8}{row.signals:>6}{row.trades:>6}"
+                  f"{pct(row.hit_rate):>8}{pct(row.avg_premium):>9}{pct(row.avg_realized):>9}{pct(row.capture):>8}"
+                  f"{pct(row.annualized):>8}{row.turnover:>8}")
+    
+    current = df[(df['scale'] == 1.0) & (df['min_amount'] == MIN_AMOUNT_THRESHOLD)]
+    print_rows(f"📋 当前参数（类型阈值 × 1.0，成交额 ≥ {MIN_AMOUNT_THRESHOLD}万）:", current)
+    # 各类型按实际收益合计选最优参数（至少有一笔成交）
+    traded = df[df['trades'] > 0]
+    best = traded.loc[traded.groupby('fund_type')['realized_sum'].idxmax()] if not traded.empty else traded
+    print_rows("🏆 各类型实际收益合计最高的参数:", best)
+    return df
+
+
+# ==========================================
+# 🔁 常驻监测模式
+# ==========================================
+# A股交易时段（与 realtime_update.sh 保持一致）
+TRADING_SESSIONS = [((9, 30), (11, 30)), ((13, 0), (15, 0))]
+DAEMON_INTERVAL = 60  # 常驻模式默认刷新间隔（秒），可用 --interval=秒 覆盖
+DAEMON_MIN_INTERVAL = 10
+
+
+def is_trading_session(now=None):
+    """当前是否处于A股交易时段（工作日）"""
+    now = now or datetime.now()
+    if now.weekday() >= 5:
+        return False
+    minutes = now.hour * 60 + now.minute
+    return any(sh * 60 + sm <= minutes < eh * 60 + em
+               for (sh, sm), (eh, em) in TRADING_SESSIONS)
+
+
+def seconds_until_next_session(now=None):
+    """距离下一个交易时段开始的秒数（交易时段内返回 0）"""
+    now = now or datetime.now()
+    if is_trading_session(now):
+        return 0
+    for day_offset in range(8):
+        day = now.date() + timedelta(days=day_offset)
+        if day.weekday() >= 5:
+            continue
+        for (sh, sm), _ in TRADING_SESSIONS:
+            start = datetime(day.year, day.month, day.day, sh, sm)
+            if start > now:
+                return (start - now).total_seconds()
+    return 0
+
+
+class StageProfiler:
+    """
+    记录每轮各阶段的耗时和结果数据占用内存
+    trace_memory=True 时另用 tracemalloc 统计各阶段的 Python 内存分配峰值（有额外开销，仅 --profile 时开启）
+    """
+
+    def __init__(self, trace_memory=False):
+        self.trace_memory = trace_memory
+        self.stages = []  # (阶段名, 耗时秒, 结果内存字节, 分配峰值字节)
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def run(self, name, func, *args, **kwargs):
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1] if self.trace_memory else None
+        size = int(result.memory_usage(deep=True).sum()) if isinstance(result, pd.DataFrame) else None
+        self.stages.append((name, elapsed, size, peak))
+        return result
+
+    def report(self):
+        print("\n⏱️ 各阶段耗时/内存:")
+        for name, elapsed, size, peak in self.stages:
+            line = f"  - {name:<8} {elapsed * 1000:8.1f}ms"
+            if size is not None:
+                line += f" | 数据 {size / 1024:8.1f}KB"
+            if peak is not None:
+                line += f" | 分配峰值 {peak / 1024 / 1024:6.1f}MB"
+            print(line)
+        print(f"  - 合计     {sum(stage[1] for stage in self.stages) * 1000:8.1f}ms")
+
+
+def run_cycle(refresh_status=False, trace_memory=False, delta=False, history_budget=None):
+    """
+    执行一轮完整更新并写出 lof_data.ts（delta=True 时写增量补丁），返回组装好的数据；关键数据获取失败时返回 None
+    history_budget 为历史面板刷新的时间预算（秒），为空时一次刷新全部基金
+    常驻模式下反复调用，HTTP 连接与各类缓存在轮次之间保持在内存中
+    """
+    profiler = StageProfiler(trace_memory)
+    
+    # 1. 获取LOF场内行情（先拿到LOF代码集合，后续各阶段都只处理这些代码）
+    spot_df = profiler.run('场内行情', get_lof_spot)
+    if spot_df is None:
+        print("❌ 获取LOF行情失败")
+        return None
+    
+    # 2. 获取实时估值（盘中IOPV），按LOF代码早过滤
+    est_df = profiler.run('实时估值', get_realtime_estimation, spot_df['code'])
+    if est_df is None:
+        print("❌ 获取实时估值失败")
+        return None
     
     # 3. 获取申购状态（关键！）
-    subscribe_status = get_fund_subscribe_status()
+    subscribe_status = profiler.run('申购状态', get_fund_subscribe_status, spot_df['code'], force=refresh_status)
     
     # 4. 计算实时套利折溢价（传入申购状态）
-    all_funds = calculate_realtime_arbitrage(spot_df, est_df, subscribe_status)
+    all_funds = profiler.run('折溢价计算', calculate_realtime_arbitrage, spot_df, est_df, subscribe_status)
     
     # 5. 获取套利机会
     opportunities = get_arbitrage_opportunities(all_funds)
@@ -908,8 +2069,10 @@ def main():
     # 6. 获取市场概览
     overview = get_market_overview(all_funds)
     
-    # 7. 获取热门LOF详情
-    hot_funds = get_hot_lof_details(all_funds)
+    # 7. 增量刷新全市场历史面板（覆盖场内行情表中的全部LOF，含停牌/无估值的），取热门LOF详情
+    panel = profiler.run('历史面板', refresh_history_panel, spot_df['code'].tolist(),
+                         priority=[code for code, _, _ in HOT_LOF_LIST], budget=history_budget)
+    hot_funds = get_hot_lof_details(all_funds, panel)
     
     # 组装数据
     data = {
@@ -924,10 +2087,23 @@ def main():
         'hot_funds': hot_funds,
     }
     
-    generate_ts_file(data)
+    profiler.run('写出文件', generate_delta_files if delta else generate_ts_file, data)
     
+    # 8. 追加盘中快照（失败不影响本轮输出）
+    try:
+        profiler.run('盘中快照', append_snapshot, all_funds)
+    except Exception as e:
+        print(f"⚠️ 快照写入失败: {e}")
+    
+    profiler.report()
+    return data
+
+
+def print_summary(data):
+    """打印数据概览"""
+    overview = data['overview']
+    premium_opps = data['opportunities']['premium']
     # 统计可套利数量
-    premium_opps = opportunities['premium']
     can_arb_count = sum(1 for f in premium_opps if f.get('can_subscribe', False))
     
     print("\n" + "=" * 60)
@@ -941,5 +2117,78 @@ def main():
     print("=" * 60)
 
 
+def run_daemon(interval=DAEMON_INTERVAL, delta=False):
+    """
+    常驻监测：进程只启动一次，交易时段内每 interval 秒刷新一轮，非交易时段休眠到下一时段开盘
+    启动时先跑一轮预热（加载缓存、建立连接），单轮异常只记录日志不退出
+    """
+    interval = max(DAEMON_MIN_INTERVAL, interval)
+    print(f"🔁 LOF常驻监测启动，交易时段内每 {interval} 秒刷新一次")
+    
+    cycles = 0
+    warm_up = True
+    while True:
+        now = datetime.now()
+        if not warm_up and not is_trading_session(now):
+            wait = seconds_until_next_session(now)
+            print(f"💤 [{now.strftime('%H:%M:%S')}] 非交易时段，{wait / 60:.0f} 分钟后开盘")
+            # 分段休眠，避免系统休眠/时钟调整后错过开盘
+            time.sleep(min(wait, 600) if wait > 0 else interval)
+            continue
+        
+        warm_up = False
+        started = time.monotonic()
+        print(f"\n⏱️ [{now.strftime('%H:%M:%S')}] 第 {cycles + 1} 轮更新")
+        try:
+            data = run_cycle(delta=delta, history_budget=interval * HISTORY_BUDGET_RATIO)
+            if data is not None:
+                print_summary(data)
+        except Exception as e:
+            print(f"❌ 本轮更新失败: {e}")
+        cycles += 1
+        
+        elapsed = time.monotonic() - started
+        print(f"⏱️ 本轮耗时 {elapsed:.1f} 秒")
+        time.sleep(max(0, interval - elapsed))
+
+
+def main():
+    print("=" * 60)
+    print("🚀 LOF基金套利监测数据获取")
+    print("📌 核心改进：使用盘中实时估值计算真实套利折溢价")
+    print("📌 新增：申购状态判断（套利生死线！）")
+    print("=" * 60)
+    
+    if '--selfcheck' in sys.argv:
+        sys.exit(0 if check_index_quote_date() else 1)
+    
+    if '--bench' in sys.argv:
+        benchmark_classify_fund()
+        return
+    
+    if '--backtest' in sys.argv:
+        run_backtest()
+        return
+    
+    if '--daemon' in sys.argv:
+        interval = DAEMON_INTERVAL
+        for arg in sys.argv[1:]:
+            if arg.startswith('--interval='):
+                interval = int(arg.split('=', 1)[1])
+        try:
+            run_daemon(interval, delta='--delta' in sys.argv)
+        except KeyboardInterrupt:
+            print("\n👋 常驻监测已停止")
+        return
+    
+    data = run_cycle(refresh_status='--refresh-status' in sys.argv, trace_memory='--profile' in sys.argv,
+                     delta='--delta' in sys.argv)
+    if data is None:
+        print("❌ 数据获取失败，退出")
+        sys.exit(1)
+    
+    print_summary(data)
+
+
 if __name__ == "__main__":
     main()
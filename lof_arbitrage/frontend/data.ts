@@ -1,2 +1,30 @@
+/// <reference types="vite/client" />
 // 数据桥接文件
-export { LOF_DATA } from '../data/lof_data';
+// 增量模式（fetch_data.py --delta）下 lof_data.ts 是完整快照，lof_patch.ts 是相对快照的累积补丁；
+// 补丁文件可能不存在，用 import.meta.glob 引入，只有与当前快照匹配时才应用
+import { LOF_DATA as LOF_SNAPSHOT } from '../data/lof_data';
+import type { HotLofFund, LofData, LofFund, LofPatch } from './types';
+
+const patchModules = import.meta.glob<{ LOF_PATCH: LofPatch }>('../data/lof_patch.ts', { eager: true });
+const LOF_PATCH = Object.values(patchModules)[0]?.LOF_PATCH ?? null;
+
+function mergeFunds<T extends LofFund>(funds: T[], updates: T[], removed: Set<string>): T[] {
+  const updated = new Map(updates.map(f => [f.code, f]));
+  const merged = funds.filter(f => !removed.has(f.code)).map(f => updated.get(f.code) ?? f);
+  const existing = new Set(funds.map(f => f.code));
+  return merged.concat(updates.filter(f => !existing.has(f.code)));
+}
+
+export function applyPatch(snapshot: LofData, patch: LofPatch | null): LofData {
+  if (!patch || patch.base !== snapshot.meta.snapshot_id) return snapshot;
+  const removed = new Set(patch.removed);
+  return {
+    meta: patch.meta,
+    overview: patch.overview,
+    opportunities: patch.opportunities,
+    all_funds: mergeFunds<LofFund>(snapshot.all_funds, patch.all_funds, removed),
+    hot_funds: mergeFunds<HotLofFund>(snapshot.hot_funds, patch.hot_funds, removed),
+  };
+}
+
+export const LOF_DATA = applyPatch(LOF_SNAPSHOT as LofData, LOF_PATCH);
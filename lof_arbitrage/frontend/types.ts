@@ -78,20 +78,47 @@ export interface MarketOverview {
   max_discount: number;
   max_premium: number;
   distribution: Distribution;
+  histogram?: { edges: number[]; counts: number[] };   // 区间边界（%）与各区间数量
+  percentiles?: Record<string, number>;                 // p5 / p25 / p50 / p75 / p95
+  by_type?: Record<string, FundTypeOverview>;           // 按基金类型分组统计
+}
+
+export interface FundTypeOverview {
+  count: number;
+  avg_discount_rate: number;
+  median_discount_rate: number;
+  max_discount: number;
+  max_premium: number;
+  distribution: Distribution;
 }
 
 export interface Opportunities {
   premium: LofFund[];
 }
 
+export interface LofMeta {
+  updated_at: string;
+  desc: string;
+  note: string;
+  snapshot_id?: string;             // 增量模式下的快照标识（补丁据此匹配）
+}
+
 export interface LofData {
-  meta: {
-    updated_at: string;
-    desc: string;
-    note: string;
-  };
+  meta: LofMeta;
   overview: MarketOverview;
   opportunities: Opportunities;
   all_funds: LofFund[];
   hot_funds: HotLofFund[];
 }
+
+// 增量补丁（fetch_data.py --delta）：相对快照的累积变化，只应用最新一个
+export interface LofPatch {
+  base: string;                     // 对应快照的 meta.snapshot_id
+  seq: number;
+  meta: LofMeta;
+  overview: MarketOverview;
+  opportunities: Opportunities;
+  all_funds: LofFund[];             // 变化超过容差或新增的基金（完整字段）
+  removed: string[];                // 快照中已不存在的基金代码
+  hot_funds: HotLofFund[];
+}
@@ -214,6 +214,12 @@ def parse_economic_data() -> dict:
                 value_match = re.search(r'"value":\s*(-?[\d.]+)', last)
                 if value_match:
                     return value_match.group(1)
+        # 紧凑列式格式: "cpi":{"d":[...],"v":[...]}
+        match = re.search(rf'"{indicator}":\{{"d":\[[^\]]*\],"v":\[([^\]]*)\]\}}', content)
+        if match:
+            values = match.group(1).split(',')
+            if values and values[-1]:
+                return values[-1]
         return None
     
     # 提取各指标
@@ -522,6 +522,16 @@ def send_lof_arbitrage_report(force=False):
             return False
         
         data = json.loads(json_match.group(1))
+        
+        # 增量模式：补丁与快照匹配时，用补丁中的最新 meta/概览/机会列表
+        patch_file = os.path.join(os.path.dirname(lof_data_file), "lof_patch.ts")
+        if data.get('meta', {}).get('snapshot_id') and os.path.exists(patch_file):
+            with open(patch_file, 'r', encoding='utf-8') as f:
+                patch_match = re.search(r'export const LOF_PATCH = ({.*?});', f.read(), re.DOTALL)
+            if patch_match:
+                patch = json.loads(patch_match.group(1))
+                if patch.get('base') == data['meta']['snapshot_id']:
+                    data.update({key: patch[key] for key in ('meta', 'overview', 'opportunities')})
     except Exception as e:
         print(f"❌ 读取LOF数据失败: {e}")
         return False